@@ -1,4 +1,26 @@
-from .component_converter import ComponentConverter
-from .component import Component
-from .pipeline_builder import PipelineBuilder
-from .pipeline import Pipeline
+import importlib
+
+_submodules = {
+    "ComponentConverter": "component_converter",
+    "Component": "component",
+    "PipelineBuilder": "pipeline_builder",
+    "Pipeline": "pipeline",
+}
+
+__all__ = list(_submodules)
+
+
+def __getattr__(name: str):
+    """
+    Import the submodule that defines the requested name on first access (PEP 562)
+    """
+    if name in _submodules:
+        module = importlib.import_module(f"{__name__}.{_submodules[name]}")
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
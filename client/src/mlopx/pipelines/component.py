@@ -1,5 +1,6 @@
 import ast
 import inspect
+import hashlib
 from typing import Callable, Dict
 
 from mlopx.pipelines import ComponentConverter
@@ -14,6 +15,8 @@ class Component:
         self.user_args = args
         self.arg_types = {}
         self.filename = None
+        self.source = None
+        self.digest = None
         self.volumes = []
 
         self.get_source_file()
@@ -34,10 +37,12 @@ class Component:
 
     def get_tree(self) -> None:
         """
-        Parse the source file to an AST
+        Read and parse the source file to an AST
         """
-        with open(self.filename, "r") as f:
-            self.tree = ast.parse(f.read())
+        with open(self.filename, "rb") as f:
+            self.source = f.read()
+        self.digest = hashlib.sha256(self.source).hexdigest()
+        self.tree = ast.parse(self.source)
 
 
     def get_arg_types(self) -> None:
@@ -55,7 +60,7 @@ class Component:
         self.volumes.append((pvc, mount_path))
 
 
-    def convert(self, platform: str) -> None:
+    def convert(self, platform: str, pretty: bool = False) -> None:
         """
         Compile the component to a kfp component
         """
@@ -66,5 +71,5 @@ class Component:
             .add_imports(self.arg_types)
             .add_decorator(self.name, self.image, platform)
             .update_arg_types(self.name)
-            .save_component(self.filename)
+            .save_component(self.filename, pretty)
         )
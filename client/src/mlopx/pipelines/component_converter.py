@@ -1,8 +1,7 @@
 import ast
-import astor
-import black
 from typing import Dict
 
+from mlopx.pipelines.source import to_source
 from mlopx.pipelines.consts import IMPORTS_MAPPING, TYPES_MAPPING, KFP_COMPONENT_DECORATOR
 
 
@@ -96,12 +95,9 @@ class ComponentConverter:
         return self
 
 
-    def save_component(self, filename: str):
+    def save_component(self, filename: str, pretty: bool = False):
         """
         Save the converted component to a file
         """
         with open(f"kfp_{filename}", "w") as f:
-            ast.fix_missing_locations(self.tree)
-            kfp_component = astor.to_source(self.tree)
-            kfp_component = black.format_str(kfp_component, mode=black.Mode())
-            f.write(kfp_component)
+            f.write(to_source(self.tree, pretty))
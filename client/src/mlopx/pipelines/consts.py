@@ -1,5 +1,7 @@
 KFP_COMPONENT_DECORATOR = "dsl.component"
 KFP_PIPELINE_DECORATOR = "dsl.pipeline"
+KFP_PIPELINE_FILENAME = "kfp_pipeline.py"
+KFP_PACKAGE_FILENAME = "kfp_pipeline.yaml"
 
 PIPELINE_IMPORTS = ["dsl.pipeline", "mount_pvc", "add_node_selector", "client"]
 
@@ -1,25 +1,37 @@
-import os
-import requests
+from __future__ import annotations
+
+import io
 import ast
-import astor
 import inspect
-import black
+import importlib.util
 import json
-from typing import List, Tuple
+from typing import List, Tuple, Set, Optional, TYPE_CHECKING
 
 from mlopx.pipelines import Component, PipelineBuilder
-from mlopx.pipelines.consts import ARGPARSE_CODE, PIPELINE_BUILD_CALL
+from mlopx.pipelines.source import to_source
+from mlopx.pipelines.consts import (
+    ARGPARSE_CODE,
+    PIPELINE_BUILD_CALL,
+    KFP_PIPELINE_FILENAME,
+    KFP_PACKAGE_FILENAME,
+)
+
+if TYPE_CHECKING:
+    import requests
 
 
 class Pipeline:
 
-    def __init__(self, name: str, metadata_file: str):
+    def __init__(self, name: str, metadata_file: str, pretty: bool = False):
         self.name = name
         self.metadata_file = metadata_file
+        self.pretty = pretty
         self.func_name = name.replace(" ", "_").lower()
         self.components = []
         self.artifacts = {}
         self.tree = None
+        self.pipeline_payload = None
+        self.metadata_payload = None
         self.pipeline_file = self.get_pipeline_file()
 
     
@@ -44,10 +56,13 @@ class Pipeline:
                     self.artifacts[arg_name] = component.name
 
     
-    def create_tmp_pipeline(self, tmp_filename: str) -> None:
+    def create_pipeline_payload(self) -> bytes:
         """
-        Create a temporary pipeline file to be submitted
+        Create the pipeline file to be submitted
         """
+        if self.pipeline_payload is not None:
+            return self.pipeline_payload
+
         with open(self.pipeline_file, "r") as f:
             code = f.read()
             tree = ast.parse(code)
@@ -60,17 +75,17 @@ class Pipeline:
                 break
             
         tree.body = tree.body[:i] + argparse_nodes + tree.body[i:-1] + run_node
-        with open(tmp_filename, "w") as f:
-            ast.fix_missing_locations(tree)
-            kfp_pipeline = astor.to_source(tree)
-            kfp_pipeline = black.format_str(kfp_pipeline, mode=black.Mode())
-            f.write(kfp_pipeline)
+        self.pipeline_payload = to_source(tree, self.pretty).encode()
+        return self.pipeline_payload
 
     
-    def create_tmp_metadata(self, tmp_filename: str) -> None:
+    def create_metadata_payload(self) -> bytes:
         """
-        Create a temporary metadata file with normalized component names
+        Create the metadata file to be submitted, with normalized component names, arguments and images
         """
+        if self.metadata_payload is not None:
+            return self.metadata_payload
+
         with open(self.metadata_file, "r") as f:
             metadata = json.load(f)
 
@@ -79,40 +94,83 @@ class Pipeline:
                 metadata["components_type"][c.lower().replace("_", "-")] = metadata["components_type"][c]
                 del metadata["components_type"][c]
 
-        with open(tmp_filename, "w") as f:
-            json.dump(metadata, f, indent=4)
+            # Component arguments and images, used by the server to identify reusable
+            # task outputs and the images to be pulled by the nodes
+            metadata["components_args"] = {
+                c.name.lower().replace("_", "-"): c.user_args or {}
+                for c in self.components
+            }
+            metadata["components_image"] = {
+                c.name.lower().replace("_", "-"): c.image
+                for c in self.components
+            }
+
+        self.metadata_payload = json.dumps(metadata, indent=4).encode()
+        return self.metadata_payload
+
+
+    def negotiate_components(self, server_url: str) -> Set[str]:
+        """
+        Ask the server which component files (by digest) it still needs
+        """
+        import requests
+
+        digests = {c.digest for c in self.components}
+        try:
+            response = requests.post(f"{server_url}/blobs/", data={"digests": sorted(digests)})
+            response.raise_for_status()
+            return set(response.json()["missing"])
+        except (requests.RequestException, ValueError, KeyError):
+            return digests
 
 
-    def prepare_files(self) -> List[Tuple]:
+    def prepare_files(self, upload: Optional[Set[str]] = None) -> List[Tuple]:
         """
-        Prepare the files for submission
+        Prepare the files for submission, entirely in memory.
+        Only components whose digest is in `upload` are included (all if not given)
         """
         # Component files
         files = [
-            ("components", (c.filename, open(c.filename, "rb"))) for c in self.components
+            ("components", (c.filename, io.BytesIO(c.source)))
+            for c in self.components
+            if upload is None or c.digest in upload
         ]
 
         # Metadata file
-        tmp_file = f"tmp_{self.metadata_file}"
-        self.create_tmp_metadata(tmp_file)
-        files.append(("metadata", ("metadata.json", open(tmp_file, "rb"))))
-        os.remove(tmp_file)
+        metadata = self.create_metadata_payload()
+        files.append(("metadata", ("metadata.json", io.BytesIO(metadata))))
 
         # Pipeline file
-        tmp_file = f"tmp_{self.pipeline_file}"
-        self.create_tmp_pipeline(tmp_file)
-        files.append(("pipeline", ("pipeline.py", open(tmp_file, "rb"))))
-        os.remove(tmp_file)
+        pipeline = self.create_pipeline_payload()
+        files.append(("pipeline", ("pipeline.py", io.BytesIO(pipeline))))
 
         return files
 
 
-    def send_pipeline(self, server_url: str, files: List[Tuple]) -> requests.Response:
+    def send_pipeline(
+        self,
+        server_url: str,
+        files: List[Tuple],
+        priority: Optional[int] = None,
+        deadline: Optional[float] = None,
+        tenant: Optional[str] = None
+    ) -> requests.Response:
         """
         Send the pipeline files to the server
         """
+        import requests
+
         try:
-            data = {"name": self.name}
+            data = {
+                "name": self.name,
+                "component_refs": [f"{c.filename}:{c.digest}" for c in self.components],
+            }
+            if priority is not None:
+                data["priority"] = priority
+            if deadline is not None:
+                data["deadline"] = deadline
+            if tenant is not None:
+                data["tenant"] = tenant
             response = requests.post(f"{server_url}/submit/", files=files, data=data)
             response.raise_for_status()
             return response
@@ -133,12 +191,21 @@ class Pipeline:
                 print("Failed to parse response JSON")
 
 
-    def submit(self, server_url: str) -> None:
+    def submit(
+        self,
+        server_url: str,
+        priority: Optional[int] = None,
+        deadline: Optional[float] = None,
+        tenant: Optional[str] = None
+    ) -> None:
         """
-        Submit the pipeline to the server
+        Submit the pipeline to the server, optionally with a priority (higher runs first),
+        a deadline (in seconds after submission) and the tenant it belongs to.
+        They default to the ones in the metadata file
         """
-        files = self.prepare_files()
-        response = self.send_pipeline(server_url, files)
+        upload = self.negotiate_components(server_url)
+        files = self.prepare_files(upload)
+        response = self.send_pipeline(server_url, files, priority, deadline, tenant)
         self.handle_response(response)
 
 
@@ -150,7 +217,7 @@ class Pipeline:
 
         for i, component in enumerate(self.components):
             _, platform = mapping[i]
-            component.convert(platform)
+            component.convert(platform, self.pretty)
 
         builder = PipelineBuilder()
         (
@@ -162,5 +229,22 @@ class Pipeline:
             .add_node_selector(self.components, mapping)
             .create_client(kfp_url)
             .add_create_run(self.func_name, enable_caching)
-            .save_pipeline()
+            .save_pipeline(self.pretty)
+        )
+        self.compile()
+
+
+    def compile(self) -> None:
+        """
+        Compile the kfp pipeline to a pipeline package (IR YAML)
+        """
+        from kfp import compiler
+
+        spec = importlib.util.spec_from_file_location("kfp_pipeline", KFP_PIPELINE_FILENAME)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        compiler.Compiler().compile(
+            pipeline_func=getattr(module, self.func_name),
+            package_path=KFP_PACKAGE_FILENAME,
         )
@@ -1,12 +1,12 @@
 import ast
-import astor
-import black
 from typing import List, Dict, Tuple
 
 from mlopx.pipelines import Component
+from mlopx.pipelines.source import to_source
 from mlopx.pipelines.consts import (
     IMPORTS_MAPPING,
     KFP_PIPELINE_DECORATOR,
+    KFP_PIPELINE_FILENAME,
     PIPELINE_IMPORTS,
 )
 
@@ -14,8 +14,17 @@ from mlopx.pipelines.consts import (
 class PipelineBuilder:
 
     def __init__(self):
-        self.tree = ast.Module(body=[])
+        self.tree = ast.Module(body=[], type_ignores=[])
         self.func_node = None
+        self.main_node = ast.If(
+            test=ast.Compare(
+                left=ast.Name(id="__name__", ctx=ast.Load()),
+                ops=[ast.Eq()],
+                comparators=[ast.Constant(value="__main__")],
+            ),
+            body=[],
+            orelse=[],
+        )
 
 
     def add_imports(self, components: List[Component]):
@@ -55,10 +64,14 @@ class PipelineBuilder:
         self.func_node = ast.FunctionDef(
             name=func_name,
             args=ast.arguments(
+                posonlyargs=[],
                 args=[],
+                kwonlyargs=[],
+                kw_defaults=[],
                 defaults=[],
             ),
             body=[],
+            decorator_list=[],
         )
         return self
 
@@ -192,7 +205,7 @@ class PipelineBuilder:
                 keywords=[ast.keyword(arg="host", value=ast.Constant(value=kfp_url))],
             ),
         )
-        self.tree.body.append(node)
+        self.main_node.body.append(node)
         return self
 
 
@@ -234,16 +247,16 @@ class PipelineBuilder:
                 keywords=[],
             )
         )
-        self.tree.body.extend([node, print_node])
+        self.main_node.body.extend([node, print_node])
         return self
 
 
-    def save_pipeline(self) -> None:
+    def save_pipeline(self, pretty: bool = False) -> None:
         """
         Save the pipeline to a file
         """
-        with open("kfp_pipeline.py", "w") as f:
-            ast.fix_missing_locations(self.tree)
-            kfp_pipeline = astor.to_source(self.tree)
-            kfp_pipeline = black.format_str(kfp_pipeline, mode=black.Mode())
-            f.write(kfp_pipeline)
+        if self.main_node.body:
+            self.tree.body.append(self.main_node)
+
+        with open(KFP_PIPELINE_FILENAME, "w") as f:
+            f.write(to_source(self.tree, pretty))
@@ -0,0 +1,13 @@
+import ast
+
+
+def to_source(tree: ast.Module, pretty: bool = False) -> str:
+    """
+    Generate the source code of an AST, optionally formatted with black
+    """
+    ast.fix_missing_locations(tree)
+    source = ast.unparse(tree) + "\n"
+    if pretty:
+        import black
+        source = black.format_str(source, mode=black.Mode())
+    return source
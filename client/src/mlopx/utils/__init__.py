@@ -1,2 +1,28 @@
-from .json_encoder import CompactJSONEncoder
-from .model_details import ModelDetails
\ No newline at end of file
+import importlib
+
+_submodules = {
+    "CompactJSONEncoder": "json_encoder",
+    "ModelDetails": "model_details",
+    "load_array": "arrays",
+    "iter_batches": "arrays",
+    "array_sequence": "arrays",
+    "normalize_images": "arrays",
+}
+
+__all__ = list(_submodules)
+
+
+def __getattr__(name: str):
+    """
+    Import the submodule that defines the requested name on first access (PEP 562)
+    """
+    if name in _submodules:
+        module = importlib.import_module(f"{__name__}.{_submodules[name]}")
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
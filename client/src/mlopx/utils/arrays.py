@@ -0,0 +1,67 @@
+from typing import Callable, Iterator, Optional, Tuple
+import numpy as np
+
+
+def load_array(path: str, mmap: bool = True) -> np.ndarray:
+    """
+    Load a NumPy artifact, memory-mapped (read-only) by default so that only the pages in use are kept in RAM.
+    """
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def normalize_images(x: np.ndarray) -> np.ndarray:
+    """
+    Normalize a batch of uint8 images to float32 in [0, 1]. Other dtypes are returned as they are.
+    """
+    return x.astype(np.float32) / 255.0 if x.dtype == np.uint8 else x
+
+
+def iter_batches(
+    x: np.ndarray,
+    y: Optional[np.ndarray] = None,
+    batch_size: int = 1024,
+    transform: Callable[[np.ndarray], np.ndarray] = np.asarray
+) -> Iterator[Tuple[np.ndarray, Optional[np.ndarray]]]:
+    """
+    Iterate over (possibly memory-mapped) arrays in contiguous batches, materializing one batch at a time.
+    The transform (e.g. `normalize_images`) is applied to each batch of x.
+    """
+    for start in range(0, len(x), batch_size):
+        stop = start + batch_size
+        yield transform(x[start:stop]), None if y is None else np.asarray(y[start:stop])
+
+
+def array_sequence(
+    x: np.ndarray,
+    y: np.ndarray,
+    batch_size: int = 32,
+    shuffle: bool = True,
+    transform: Callable[[np.ndarray], np.ndarray] = np.asarray,
+    **kwargs
+):
+    """
+    Wrap (possibly memory-mapped) arrays in a keras dataset that gathers one batch at a time.
+    The transform (e.g. `normalize_images`) is applied to each batch of x.
+    Extra keyword arguments are passed to `keras.utils.PyDataset` (e.g. workers).
+    """
+    import keras
+
+    class ArraySequence(keras.utils.PyDataset):
+
+        def __init__(self):
+            super().__init__(**kwargs)
+            self.indices = np.arange(len(x))
+            self.on_epoch_end()
+
+        def __len__(self):
+            return -(-len(x) // batch_size)
+
+        def __getitem__(self, index):
+            batch = np.sort(self.indices[index * batch_size:(index + 1) * batch_size])
+            return transform(x[batch]), y[batch]
+
+        def on_epoch_end(self):
+            if shuffle:
+                np.random.shuffle(self.indices)
+
+    return ArraySequence()
@@ -15,16 +15,24 @@ def model_evaluation(
 
     device = "/GPU:0" if tf.config.list_physical_devices("GPU") else "/CPU:0"
 
+    def to_float32(x):
+        # uint8 images are normalized on load
+        return x.astype(np.float32) / 255.0 if x.dtype == np.uint8 else x
+
     # Load data
-    x_test = np.load(x_test_ds.path)
-    y_test = np.load(y_test_ds.path)
+    x_test = np.load(x_test_ds.path, mmap_mode="r")
+    y_test = np.load(y_test_ds.path, mmap_mode="r")
 
     # Load model
     model = keras.models.load_model(model_artifact.path + "/model.h5")
 
-    # Evaluate model
+    # Evaluate model in batches
+    batch_size = 1024
     with tf.device(device):
-        y_pred = model.predict(x_test)
+        y_pred = np.concatenate([
+            model.predict(to_float32(x_test[i:i + batch_size]), verbose=0)
+            for i in range(0, len(x_test), batch_size)
+        ])
         y_pred = np.argmax(y_pred, axis=1)
     
     metrics = {
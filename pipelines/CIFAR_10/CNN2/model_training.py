@@ -4,7 +4,8 @@ from mlopx.pipelines.artifacts import InputDataset, OutputModel
 def model_training(
     x_train_ds: InputDataset,
     y_train_ds: InputDataset,
-    model_artifact: OutputModel
+    model_artifact: OutputModel,
+    checkpoint_dir: str = ""
 ):
     
     import random
@@ -21,9 +22,36 @@ def model_training(
     device = "/GPU:0" if tf.config.list_physical_devices("GPU") else "/CPU:0"
 
 
+    def to_float32(x):
+        # uint8 images are normalized on load
+        return x.astype(np.float32) / 255.0 if x.dtype == np.uint8 else x
+
+    class ArraySequence(keras.utils.PyDataset):
+        """
+        Gather shuffled batches from memory-mapped arrays, one batch at a time.
+        """
+
+        def __init__(self, x, y, batch_size):
+            super().__init__()
+            self.x, self.y = x, y
+            self.batch_size = batch_size
+            self.indices = np.arange(len(x))
+            self.on_epoch_end()
+
+        def __len__(self):
+            return -(-len(self.x) // self.batch_size)
+
+        def __getitem__(self, index):
+            batch = self.indices[index * self.batch_size:(index + 1) * self.batch_size]
+            batch = np.sort(batch)
+            return to_float32(self.x[batch]), self.y[batch]
+
+        def on_epoch_end(self):
+            np.random.shuffle(self.indices)
+
     # Load data
-    x_train = np.load(x_train_ds.path)
-    y_train = np.load(y_train_ds.path)
+    x_train = np.load(x_train_ds.path, mmap_mode="r")
+    y_train = np.load(y_train_ds.path, mmap_mode="r")
 
     # Define the model
     input_shape = (32, 32, 3)
@@ -58,9 +86,15 @@ def model_training(
         metrics=['accuracy']
     )
 
+    # Back up the training state at the end of every epoch if a checkpoint directory is given,
+    # so that a preempted run resumes from the last completed epoch
+    callbacks = []
+    if checkpoint_dir:
+        callbacks.append(keras.callbacks.BackupAndRestore(backup_dir=checkpoint_dir))
+
     # Train the model
     with tf.device(device):
-        model.fit(x_train, y_train, epochs=10, batch_size=64)
+        model.fit(ArraySequence(x_train, y_train, 64), epochs=10, callbacks=callbacks)
 
     # Save model
     model.save(model_artifact.path + "/model.h5")
@@ -17,15 +17,19 @@ def model_evaluation(
 
 
     # Load data
-    x_test = np.load(x_test_ds.path)
-    y_test = np.load(y_test_ds.path)
+    x_test = np.load(x_test_ds.path, mmap_mode="r")
+    y_test = np.load(y_test_ds.path, mmap_mode="r")
 
     # Load model
     model = keras.models.load_model(model_artifact.path + "/model.h5")
 
-    # Evaluate model
+    # Evaluate model in batches
+    batch_size = 1024
     with tf.device(device):
-        y_pred = model.predict(x_test)
+        y_pred = np.concatenate([
+            model.predict(x_test[i:i + batch_size], verbose=0)
+            for i in range(0, len(x_test), batch_size)
+        ])
         y_pred = np.argmax(y_pred, axis=1)
     
     metrics = {
@@ -4,7 +4,8 @@ from mlopx.pipelines.artifacts import InputDataset, OutputModel
 def model_training(
     x_train_ds: InputDataset,
     y_train_ds: InputDataset,
-    model_artifact: OutputModel
+    model_artifact: OutputModel,
+    checkpoint_dir: str = ""
 ):
     
     import random
@@ -20,9 +21,32 @@ def model_training(
     device = "/GPU:0" if tf.config.list_physical_devices("GPU") else "/CPU:0"
 
 
+    class ArraySequence(keras.utils.PyDataset):
+        """
+        Gather shuffled batches from memory-mapped arrays, one batch at a time.
+        """
+
+        def __init__(self, x, y, batch_size):
+            super().__init__()
+            self.x, self.y = x, y
+            self.batch_size = batch_size
+            self.indices = np.arange(len(x))
+            self.on_epoch_end()
+
+        def __len__(self):
+            return -(-len(self.x) // self.batch_size)
+
+        def __getitem__(self, index):
+            batch = self.indices[index * self.batch_size:(index + 1) * self.batch_size]
+            batch = np.sort(batch)
+            return self.x[batch], self.y[batch]
+
+        def on_epoch_end(self):
+            np.random.shuffle(self.indices)
+
     # Load data
-    x_train = np.load(x_train_ds.path)
-    y_train = np.load(y_train_ds.path)
+    x_train = np.load(x_train_ds.path, mmap_mode="r")
+    y_train = np.load(y_train_ds.path, mmap_mode="r")
 
     # Define model
     input_shape = (x_train.shape[1],)
@@ -46,9 +70,15 @@ def model_training(
         metrics=['accuracy']
     )
 
+    # Back up the training state at the end of every epoch if a checkpoint directory is given,
+    # so that a preempted run resumes from the last completed epoch
+    callbacks = []
+    if checkpoint_dir:
+        callbacks.append(keras.callbacks.BackupAndRestore(backup_dir=checkpoint_dir))
+
     # Model training
     with tf.device(device):
-        model.fit(x_train, y_train, epochs=10, batch_size=64)
+        model.fit(ArraySequence(x_train, y_train, 64), epochs=10, callbacks=callbacks)
 
     # Save model
     model.save(model_artifact.path + "/model.h5")
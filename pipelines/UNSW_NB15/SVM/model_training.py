@@ -13,8 +13,8 @@ def model_training(
 
 
     # Load data
-    x_train = np.load(x_train_ds.path)
-    y_train = np.load(y_train_ds.path)
+    x_train = np.load(x_train_ds.path, mmap_mode="r")
+    y_train = np.load(y_train_ds.path, mmap_mode="r")
 
     # Train model
     model = LinearSVC(random_state=42, max_iter=1000)
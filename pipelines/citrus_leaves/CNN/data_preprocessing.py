@@ -6,7 +6,8 @@ def data_preprocessing(
     x_train_ds: OutputDataset,
     x_test_ds: OutputDataset,
     y_train_ds: OutputDataset,
-    y_test_ds: OutputDataset
+    y_test_ds: OutputDataset,
+    normalize_on_load: bool = True
 ):
 
     import numpy as np
@@ -21,8 +22,9 @@ def data_preprocessing(
     x = np.load(f"{dataset_path}/x.npy")
     y = np.load(f"{dataset_path}/y.npy")
 
-    # Normalize pixel values
-    x = x / 255.0
+    # Normalize pixel values, unless they are kept as uint8 and normalized on load
+    if not normalize_on_load:
+        x = (x / 255.0).astype(np.float32)
 
     # Split the data into training and testing sets
     x_train, x_test, y_train, y_test = train_test_split(
@@ -13,14 +13,18 @@ def model_evaluation(
     from sklearn.metrics import accuracy_score, f1_score, precision_score, confusion_matrix
 
     # Load data
-    x_test = np.load(x_test_ds.path)
-    y_test = np.load(y_test_ds.path)
+    x_test = np.load(x_test_ds.path, mmap_mode="r")
+    y_test = np.load(y_test_ds.path, mmap_mode="r")
 
     # Load model
     model = joblib.load(model_artifact.path)
 
-    # Evaluate model
-    y_pred = model.predict(x_test)
+    # Evaluate model in batches
+    batch_size = 1024
+    y_pred = np.concatenate([
+        model.predict(x_test[i:i + batch_size])
+        for i in range(0, len(x_test), batch_size)
+    ])
     
     metrics = {
         "accuracy": accuracy_score(y_test, y_pred),
@@ -1,5 +1,11 @@
 from .node_manager import NodeManager
+from .footprint_profiler import FootprintProfiler
 from .data_manager import DataManager
 from .ml_estimator import MLEstimator
+from .template_cache import TemplateCache
+from .blob_store import BlobStore
+from .artifact_cache import ArtifactCache
+from .waiting_queue import WaitingQueue
+from .fair_share_queue import FairShareQueue
 from .decision_unit import DecisionUnit
 from .pipeline_manager import PipelineManager
\ No newline at end of file
@@ -0,0 +1,68 @@
+import os
+import json
+import time
+import hashlib
+from typing import Dict
+
+from server.settings import artifact_cache_file
+
+
+class ArtifactCache:
+
+    def __init__(self):
+        self.cache_file = artifact_cache_file
+        self.entries: Dict[str, Dict] = {}
+        self._load_entries()
+
+
+    def _load_entries(self) -> None:
+        """
+        Load the cache entries recorded by previous runs of the server.
+        """
+        if self.cache_file.exists():
+            with open(self.cache_file, "r") as f:
+                self.entries = json.load(f)
+
+
+    def _save_entries(self) -> None:
+        """
+        Persist the cache entries, since the cached artifacts outlive the server.
+        """
+        tmp_path = self.cache_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(tmp_path, self.cache_file)
+
+
+    @staticmethod
+    def compute_key(dataset_version: str, source: bytes, args: Dict) -> str:
+        """
+        Compute the cache key of a preprocessing task from the dataset version,
+        the source of its component and its arguments.
+        """
+        digest = hashlib.sha256()
+        digest.update(dataset_version.encode())
+        digest.update(hashlib.sha256(source).digest())
+        digest.update(json.dumps(args, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+
+    def has(self, key: str) -> bool:
+        """
+        Check if the artifacts of a preprocessing task are cached.
+        """
+        return key in self.entries
+
+
+    def add(self, key: str, pipeline_id: str, component: str) -> None:
+        """
+        Record the artifacts produced by a preprocessing task.
+        """
+        if key in self.entries:
+            return
+        self.entries[key] = {
+            "pipeline_id": pipeline_id,
+            "component": component,
+            "created_at": time.time()
+        }
+        self._save_entries()
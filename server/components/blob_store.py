@@ -0,0 +1,77 @@
+import os
+import re
+import shutil
+import hashlib
+from pathlib import Path
+from typing import List
+
+from server.settings import blobs_dir
+
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+
+    def __init__(self):
+        self.blobs_dir = blobs_dir
+
+
+    @staticmethod
+    def compute_digest(content: bytes) -> str:
+        """
+        Compute the content digest (SHA-256) of a file.
+        """
+        return hashlib.sha256(content).hexdigest()
+
+
+    def _get_path(self, digest: str) -> Path:
+        """
+        Get the path of a blob, validating its digest.
+        """
+        if not DIGEST_PATTERN.match(digest):
+            raise ValueError(f"Invalid digest: {digest}")
+        return self.blobs_dir / digest
+
+
+    def has(self, digest: str) -> bool:
+        """
+        Check if a blob is stored.
+        """
+        try:
+            return self._get_path(digest).exists()
+        except ValueError:
+            return False
+
+
+    def missing(self, digests: List[str]) -> List[str]:
+        """
+        Get the digests of the blobs that are not stored.
+        """
+        return [digest for digest in dict.fromkeys(digests) if not self.has(digest)]
+
+
+    def put(self, content: bytes) -> str:
+        """
+        Store a blob and return its digest.
+        """
+        digest = self.compute_digest(content)
+        path = self._get_path(digest)
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return digest
+
+
+    def link(self, digest: str, dest: Path) -> None:
+        """
+        Make a blob available at the destination path (hardlink, or copy across filesystems).
+        """
+        path = self._get_path(digest)
+        dest.unlink(missing_ok=True)
+        try:
+            os.link(path, dest)
+        except OSError:
+            shutil.copyfile(path, dest)
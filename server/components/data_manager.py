@@ -1,11 +1,16 @@
 import os
 from pathlib import Path
-import subprocess
 from datetime import datetime
-from typing import Dict, Optional, List
+from collections import OrderedDict
+from typing import Dict, Optional, List, Tuple
 import numpy as np
 
-from server.settings import DATASETS_PATH
+from server.settings import DATASETS_PATH, NFS_BANDWIDTH, LOCAL_DISK_BANDWIDTH
+from server.components import FootprintProfiler
+
+
+IN_MEMORY_FACTOR = 2    # loaded data plus a working copy
+MMAP_FACTOR = 1         # page cache of the mapped artifact
 
 
 class DataManager:
@@ -13,43 +18,80 @@ class DataManager:
     def __init__(self):
         self.datasets_dir = Path(DATASETS_PATH)
         self.datasets: Dict[str, Dict] = {}
+        self.files: Dict[str, Dict[str, Tuple[int, int, int]]] = {}
+        self.footprints: Dict[str, Tuple[datetime, Dict]] = {}
+        self.profiler = FootprintProfiler()
+        self.warm: Dict[str, OrderedDict[str, Tuple[str, int]]] = {}
         self._fetch_datasets()
 
 
     def _fetch_datasets(self):
         """
-        Fetch and update datasets registry with details of new or modified datasets.
+        Fetch and update datasets registry with details of new, modified or removed datasets.
         """
-        folder_names = [
-            name for name in os.listdir(self.datasets_dir)
-            if not name.startswith(".")
-        ]
+        folders = {
+            entry.name: Path(entry.path)
+            for entry in os.scandir(self.datasets_dir)
+            if not entry.name.startswith(".")
+        }
 
-        for name in folder_names:
-            folder_path = self.datasets_dir / name
-            last_modified = self._get_last_modified_time(folder_path)
+        for name in self.datasets.keys() - folders.keys():
+            del self.datasets[name]
+            del self.files[name]
+            self.footprints.pop(name, None)
 
-            if name not in self.datasets or self.datasets[name]["modified_at"] < last_modified:
-                self.datasets[name] = {
-                    "path": folder_path,
-                    "size": self._get_folder_size_kb(folder_path),
-                    "modified_at": last_modified
-                }
+        for name, folder_path in folders.items():
+            self._update_dataset(name, folder_path)
 
 
-    def _get_last_modified_time(self, path: Path) -> datetime:
+    def _update_dataset(self, name: str, folder_path: Path):
         """
-        Get the last modification time of a file/folder.
+        Rescan a dataset and apply the changes of its files to its size incrementally.
         """
-        return datetime.fromtimestamp(os.path.getmtime(path))
-    
+        records = self._scan_files(folder_path)
+        previous = self.files.get(name, {})
+        if name in self.datasets and records == previous:
+            return
+
+        size = self.datasets[name]["size_bytes"] if name in self.datasets else 0
+        for file, record in records.items():
+            if previous.get(file) != record:
+                size += record[0] - previous.get(file, (0,))[0]
+        for file in previous.keys() - records.keys():
+            size -= previous[file][0]
+
+        last_modified = max(mtime for _, mtime, _ in records.values())
+        self.files[name] = records
+        self.datasets[name] = {
+            "path": folder_path,
+            "size": size // 1024,
+            "size_bytes": size,
+            "modified_at": datetime.fromtimestamp(last_modified / 1e9)
+        }
 
-    def _get_folder_size_kb(self, folder: Path) -> int:
+
+    def _scan_files(self, path: Path) -> Dict[str, Tuple[int, int, int]]:
         """
-        Get folder size in kilobytes.
+        Walk a dataset and collect the (size, mtime, inode) records of its files and folders.
+        Folders are recorded with size 0, so that removed files update the modification time.
         """
-        result = subprocess.run(["du", "-sk", str(folder)], capture_output=True, text=True)
-        return int(result.stdout.split()[0])
+        stat = path.stat()
+        if not path.is_dir():
+            return {".": (stat.st_size, stat.st_mtime_ns, stat.st_ino)}
+
+        records = {".": (0, stat.st_mtime_ns, stat.st_ino)}
+        folders = [path]
+        while folders:
+            with os.scandir(folders.pop()) as entries:
+                for entry in entries:
+                    stat = entry.stat(follow_symlinks=False)
+                    key = os.path.relpath(entry.path, path)
+                    if entry.is_dir(follow_symlinks=False):
+                        records[key] = (0, stat.st_mtime_ns, stat.st_ino)
+                        folders.append(Path(entry.path))
+                    else:
+                        records[key] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        return records
 
 
     def _estimate_npy_array_size_kb(self, details: Dict) -> int:
@@ -101,6 +143,48 @@ class DataManager:
         return None
     
 
+    def get_dataset_version(self, dataset_name: str) -> Optional[str]:
+        """
+        Get the version of a dataset, identified by its last modification time.
+        Returns None if dataset is not found.
+        """
+        if dataset_name in self.datasets:
+            return self.datasets[dataset_name]["modified_at"].isoformat()
+        return None
+
+
+    def get_footprint(self, metadata: Dict) -> Optional[Dict[str, int]]:
+        """
+        Get the original and preprocessed memory footprints of a dataset in kilobytes,
+        profiled from its files once per dataset version.
+        Returns None if dataset is not found.
+        """
+        name = metadata.get("name")
+        dataset = self.datasets.get(name)
+        if dataset is None:
+            return None
+
+        cached = self.footprints.get(name)
+        if cached is None or cached[0] != dataset["modified_at"]:
+            files = [
+                dataset["path"] / file
+                for file, (size, _, _) in self.files[name].items()
+                if size > 0
+            ]
+            self.footprints[name] = (dataset["modified_at"], self.profiler.profile(files))
+
+        profile = self.footprints[name][1]
+        footprint = {
+            key: self.profiler.estimate(profile, metadata, key) // 1024
+            for key in ("original", "preprocessed")
+        }
+
+        # Preprocessed tabular data is stored as numeric arrays described by the metadata
+        if metadata.get("type") == "tabular":
+            footprint["preprocessed"] = self._estimate_npy_array_size_kb(metadata.get("preprocessed"))
+        return footprint
+
+
     def size_in_memory(self, metadata: Dict, version_key: str) -> Optional[int]:
         """
         Estimate the dataset's memory size in kilobytes.
@@ -112,11 +196,84 @@ class DataManager:
         name = metadata.get("name")
         version_details = metadata.get(version_key)
 
+        footprint = self.get_footprint(metadata)
+        if footprint is not None and footprint[version_key] > 0:
+            return footprint[version_key]
+
+        # Fallback when the dataset files cannot be profiled
         if dataset_type == "image":
             size = self.get_dataset_size(name)
-            if not metadata.get("normalized"):
+            if not metadata.get("normalized") and not metadata.get("normalize_on_load"):
                 size *= 8  # from uint8 to float64
         elif dataset_type == "tabular":
             size = self._estimate_npy_array_size_kb(version_details)
         
-        return size
\ No newline at end of file
+        return size
+
+
+    def is_warm(self, node: str, metadata: Dict) -> bool:
+        """
+        Check if the current version of a dataset is cached on a node.
+        """
+        name = metadata.get("name")
+        entry = self.warm.get(node, {}).get(name)
+        return entry is not None and entry[0] == self.get_dataset_version(name)
+
+
+    def mark_warm(self, node: Dict, metadata: Dict) -> None:
+        """
+        Record that a node read a dataset, evicting the least recently read
+        datasets once the node's cache size (in kilobytes) is exceeded.
+        """
+        name = metadata.get("name")
+        version = self.get_dataset_version(name)
+        size = self.get_dataset_size(name)
+        if version is None or size > node["cache_size"]:
+            return
+
+        cache = self.warm.setdefault(node["name"], OrderedDict())
+        cache[name] = (version, size)
+        cache.move_to_end(name)
+        while sum(size for _, size in cache.values()) > node["cache_size"]:
+            cache.popitem(last=False)
+
+
+    def read_time(self, node: str, metadata: Dict) -> float:
+        """
+        Estimate the time (in seconds) a node takes to read a dataset,
+        from its local cache if warm or over NFS otherwise.
+        """
+        size = self.get_dataset_size(metadata.get("name")) or 0
+        bandwidth = LOCAL_DISK_BANDWIDTH if self.is_warm(node, metadata) else NFS_BANDWIDTH
+        return size * 1024 * 8 / (bandwidth * 1e6)
+
+
+    def memory_required(self, metadata: Dict, component_type: str) -> int:
+        """
+        Estimate the memory required by a pipeline stage in kilobytes.
+        Stages that load the dataset in full keep it plus a working copy, while
+        memory-mapped stages only page in the data they touch, counted once.
+        `memory_mapped` is either true for all stages after preprocessing, or the list
+        of stage types that stream their inputs in batches (e.g. ["evaluation"]).
+
+        :param metadata: Dataset metadata dictionary
+        :param component_type: Type of the stage ('preprocessing', 'training' or 'evaluation')
+        """
+        if component_type == "preprocessing":
+            size = max(
+                self.size_in_memory(metadata, "original"),
+                self.size_in_memory(metadata, "preprocessed")
+            )
+            return size * IN_MEMORY_FACTOR
+
+        size = self.size_in_memory(metadata, "preprocessed")
+        if component_type == "training":
+            size = int(size * metadata["train_percentage"])
+        elif component_type == "evaluation":
+            size = int(size * metadata["test_percentage"])
+
+        memory_mapped = metadata.get("memory_mapped", False)
+        if isinstance(memory_mapped, list):
+            memory_mapped = component_type in memory_mapped
+        factor = MMAP_FACTOR if memory_mapped else IN_MEMORY_FACTOR
+        return size * factor
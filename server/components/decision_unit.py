@@ -10,6 +10,7 @@ from server.placers import (
     FifoRoundRobinPlacer,
     FifoGreedyPlacer,
     RandomRandomPlacer,
+    VectorPackingPlacer,
 )
 
 
@@ -19,6 +20,7 @@ placers = {
     "fifo_round_robin": FifoRoundRobinPlacer,
     "fifo_greedy": FifoGreedyPlacer,
     "random_random": RandomRandomPlacer,
+    "vector_packing": VectorPackingPlacer,
 }
 
 
@@ -37,28 +39,62 @@ class DecisionUnit:
         """
         Initialize the assignments and counts for each node.
         """
+        self.update_nodes()
+
+
+    def update_nodes(self) -> None:
+        """
+        Update the nodes and their assignments: nodes that joined get empty ones,
+        and those of nodes that left are dropped once empty.
+        """
         self.node_manager.update_nodes()
-        for node in self.node_manager.get_nodes():
-            name = node["name"]
-            self.assignments[name] = set()
-            self.assignments_counts[name] = 0
+        for name in self.node_manager.nodes:
+            self.assignments.setdefault(name, set())
+            self.assignments_counts.setdefault(name, 0)
+        for name in list(self.assignments):
+            if name not in self.node_manager.nodes and not self.assignments[name]:
+                del self.assignments[name]
+                del self.assignments_counts[name]
 
     
     def rm_assignment(self, node: str, pipeline_id: str, component: str) -> None:
         """
-        Remove the assignment of a component to a node.
+        Remove the assignment of a component to a node and release its memory.
         """
         component_id = f"{pipeline_id}/{component}"
-        if component_id in self.assignments[node]:
+        self.node_manager.release_memory(node, component_id)
+        if component_id in self.assignments.get(node, ()):
             self.assignments[node].remove(component_id)
             self.assignments_counts[node] -= 1
 
 
+    def move_assignment(self, node: str, new_node: str, pipeline_id: str, component: str) -> None:
+        """
+        Move the assignment of a component, along with its memory reservation, to another node.
+        """
+        component_id = f"{pipeline_id}/{component}"
+        size = self.node_manager.get_reserved_memory(node, component_id)
+        self.rm_assignment(node, pipeline_id, component)
+        self.assignments[new_node].add(component_id)
+        self.assignments_counts[new_node] += 1
+        if size is not None:
+            self.node_manager.reserve_memory(new_node, component_id, size)
+
+
+    def get_node_filters(self, component_type: str, metadata: Dict) -> Dict:
+        """
+        Get the filters of the nodes eligible for a stage under the heuristics of the placer, if any.
+        """
+        if isinstance(self.placer, CustomPlacer):
+            return self.placer.get_node_filters(component_type, metadata)
+        return {}
+
+
     def is_node_needed(self, node: str, pipeline_id: str) -> bool:
         """
         Check if a node is still needed for a pipeline.
         """
-        for pipeline in self.assignments[node]:
+        for pipeline in self.assignments.get(node, ()):
             if pipeline.split("/")[0] == pipeline_id:
                 return True
         return False
@@ -68,6 +104,7 @@ class DecisionUnit:
         """
         Get the placements for each pipeline using a selected placer.
         """
+        self.update_nodes()
         placements = self.placer.place_pipelines(
             pipelines, self.assignments, self.assignments_counts
         )
@@ -0,0 +1,198 @@
+import time
+import heapq
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from server.components import WaitingQueue
+from server.settings import DEFAULT_TENANT, TENANT_WEIGHTS, TENANT_MAX_NODES, TENANT_MAX_MEMORY
+
+
+class FairShareQueue:
+
+    def __init__(self):
+        self.weights = TENANT_WEIGHTS
+        self.max_nodes = TENANT_MAX_NODES
+        self.max_memory = TENANT_MAX_MEMORY              # in MB
+        self.queues: Dict[str, WaitingQueue] = {}
+        self.tenants: Dict[str, str] = {}                # pipeline_id -> tenant
+        self.demands: Dict[str, Tuple[int, int]] = {}    # pipeline_id -> (nodes, memory in KB)
+        self.capacity: Tuple[int, int] = (1, 1)          # (nodes, memory in KB) of the cluster
+        self.usage: Dict[str, List[int]] = {}            # tenant -> [nodes, memory in KB] in use
+        self.accounting: Dict[str, Dict[str, float]] = {}
+        self.last_update = None
+
+
+    def get_weight(self, tenant: str) -> float:
+        """
+        Get the weight of a tenant in the fair share.
+        """
+        return self.weights.get(tenant, self.weights.get("*", 1.0))
+
+
+    def get_share(self, tenant: str) -> float:
+        """
+        Get the weighted dominant share of a tenant: the largest fraction of the cluster nodes or memory
+        it uses, divided by its weight (Dominant Resource Fairness).
+        """
+        nodes, memory = self.usage.get(tenant, [0, 0])
+        share = max(nodes / self.capacity[0], memory / self.capacity[1])
+        return share / self.get_weight(tenant)
+
+
+    def push(
+        self,
+        pipeline_id: str,
+        service: float,
+        submitted_at: float,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        tenant: str = DEFAULT_TENANT,
+        demand: Tuple[int, int] = (0, 0)
+    ) -> None:
+        """
+        Add a pipeline to the queue of its tenant, with the nodes and memory (in KB) it requires.
+        """
+        self.remove(pipeline_id)
+        self.tenants[pipeline_id] = tenant
+        self.demands[pipeline_id] = demand
+        self.queues.setdefault(tenant, WaitingQueue()).push(pipeline_id, service, submitted_at, priority, deadline)
+
+
+    def remove(self, pipeline_id: str) -> None:
+        """
+        Remove a pipeline from the queue of its tenant.
+        """
+        tenant = self.tenants.pop(pipeline_id, None)
+        self.demands.pop(pipeline_id, None)
+        if tenant is not None:
+            self.queues[tenant].remove(pipeline_id)
+
+
+    def clear(self) -> None:
+        """
+        Remove all pipelines from the queues.
+        """
+        for queue in self.queues.values():
+            queue.clear()
+        self.tenants.clear()
+        self.demands.clear()
+
+
+    def starving(self, now: Optional[float] = None) -> List[str]:
+        """
+        Get the pipelines of all tenants waiting for longer than MAX_WAIT seconds, oldest first.
+        """
+        starving = [p for queue in self.queues.values() for p in queue.starving(now)]
+        return sorted(starving, key=lambda p: self.queues[self.tenants[p]].details[p][1])
+
+
+    def ordered(self, now: Optional[float] = None) -> List[str]:
+        """
+        Get the pipelines in the order they should be triggered: starving pipelines first, then
+        interleaving the tenants by weighted fair queuing on their dominant share.
+        """
+        return list(self.iter_ordered(now))
+
+
+    def iter_ordered(self, now: Optional[float] = None) -> Iterator[str]:
+        """
+        Iterate lazily over the pipelines in the order they should be triggered: starving pipelines
+        first, then interleaving the tenants by weighted fair queuing on their dominant share.
+        The tenant with the lowest share is served next (O(log tenants) with a heap), and its share
+        is increased by the demand of its pipeline. Each tenant serves its own pipelines by rank,
+        popping them from its queue only as they are served.
+        """
+        starving = self.starving(now)
+        skip = set(starving)
+        for pipeline_id in starving:
+            if pipeline_id in self.tenants:
+                yield pipeline_id
+
+        pending = {tenant: queue.iter_ordered(now) for tenant, queue in self.queues.items() if len(queue)}
+        heap = [(self.get_share(tenant), tenant) for tenant in pending]
+        heapq.heapify(heap)
+        while heap:
+            share, tenant = heapq.heappop(heap)
+            pipeline_id = next((p for p in pending[tenant] if p not in skip), None)
+            if pipeline_id is None:
+                continue
+            demand = self.demands.get(pipeline_id, (0, 0))
+            yield pipeline_id
+            share += max(demand[0] / self.capacity[0], demand[1] / self.capacity[1]) / self.get_weight(tenant)
+            heapq.heappush(heap, (share, tenant))
+
+
+    def within_quota(self, pipeline_id: str, demand: Tuple[int, int]) -> bool:
+        """
+        Check if the tenant of a pipeline can use the given nodes and memory (in KB) on top of its usage.
+        A tenant using nothing is always allowed one pipeline, even if larger than its quota.
+        """
+        tenant = self.tenants.get(pipeline_id, DEFAULT_TENANT)
+        nodes, memory = self.usage.get(tenant, [0, 0])
+        if nodes == 0 and memory == 0:
+            return True
+        max_nodes = self.max_nodes.get(tenant, self.max_nodes.get("*"))
+        max_memory = self.max_memory.get(tenant, self.max_memory.get("*"))
+        if max_nodes is not None and nodes + demand[0] > max_nodes:
+            return False
+        if max_memory is not None and memory + demand[1] > max_memory * 1024:
+            return False
+        return True
+
+
+    def add_usage(self, tenant: str, demand: Tuple[int, int]) -> None:
+        """
+        Add the nodes and memory (in KB) of a triggered pipeline to the usage of its tenant.
+        """
+        usage = self.usage.setdefault(tenant, [0, 0])
+        usage[0] += demand[0]
+        usage[1] += demand[1]
+
+
+    def update_usage(self, usage: Dict[str, List[int]], capacity: Tuple[int, int]) -> None:
+        """
+        Set the nodes and memory (in KB) used by each tenant and the capacity of the cluster,
+        accounting the usage since the last update in node-seconds and GB-seconds.
+        """
+        now = time.time()
+        if self.last_update is not None:
+            elapsed = now - self.last_update
+            for tenant, (nodes, memory) in self.usage.items():
+                accounting = self.accounting.setdefault(tenant, {"node_seconds": 0.0, "memory_gb_seconds": 0.0})
+                accounting["node_seconds"] += nodes * elapsed
+                accounting["memory_gb_seconds"] += memory / 1024 ** 2 * elapsed
+        self.last_update = now
+        self.usage = usage
+        self.capacity = (max(capacity[0], 1), max(capacity[1], 1))
+
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """
+        Get the share, usage and accounting of each tenant.
+        """
+        tenants = set(self.queues) | set(self.usage) | set(self.accounting)
+        metrics = {}
+        for tenant in sorted(tenants):
+            nodes, memory = self.usage.get(tenant, [0, 0])
+            accounting = self.accounting.get(tenant, {"node_seconds": 0.0, "memory_gb_seconds": 0.0})
+            metrics[tenant] = {
+                "weight": self.get_weight(tenant),
+                "share": self.get_share(tenant),
+                "nodes": nodes,
+                "memory": memory,
+                "waiting_pipelines": len(self.queues.get(tenant, ())),
+                "node_seconds": accounting["node_seconds"],
+                "memory_gb_seconds": accounting["memory_gb_seconds"]
+            }
+        return metrics
+
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_ordered()
+
+
+    def __len__(self) -> int:
+        return len(self.tenants)
+
+
+    def __contains__(self, pipeline_id: str) -> bool:
+        return pipeline_id in self.tenants
@@ -0,0 +1,155 @@
+import csv
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+from server.settings import FOOTPRINT_SAMPLE_ROWS
+
+
+PROFILED_SUFFIXES = (".npy", ".csv")
+CHUNK_SIZE = 1 << 20    # bytes read at a time when counting rows
+POINTER_SIZE = 8        # object columns store a pointer per value
+NUMERIC_SIZE = 8        # pandas parses numeric columns as int64/float64
+
+
+class FootprintProfiler:
+
+    def __init__(self):
+        self.sample_rows = FOOTPRINT_SAMPLE_ROWS
+
+
+    def profile(self, files: List[Path]) -> Dict:
+        """
+        Profile the files of a dataset without loading them.
+        NumPy arrays are described by their headers and CSV tables are sampled.
+        Other files (e.g. notes) are not loaded by the tasks and are skipped.
+        """
+        arrays = []
+        tables = []
+        for path in files:
+            if path.suffix.lower() not in PROFILED_SUFFIXES:
+                continue
+            if path.suffix.lower() == ".npy":
+                arrays.append(self._read_npy_header(path))
+            else:
+                table = self._sample_csv(path)
+                if table is not None:
+                    tables.append(table)
+        return {"arrays": arrays, "tables": tables}
+
+
+    def estimate(self, profile: Dict, metadata: Dict, version_key: str) -> int:
+        """
+        Estimate the memory footprint of a dataset version in bytes.
+
+        :param profile: Dataset profile returned by `profile`
+        :param metadata: Dataset metadata dictionary
+        :param version_key: Key for the desired version ('original' or 'preprocessed')
+        """
+        if version_key == "preprocessed":
+            dtype = self._preprocessed_dtype(metadata)
+        else:
+            dtype = None
+
+        size = 0
+        for array in profile["arrays"]:
+            n_elements = int(np.prod(array["shape"]))
+            itemsize = np.dtype(array["dtype"]).itemsize
+            if dtype is not None and len(array["shape"]) > 1:
+                itemsize = dtype.itemsize   # features are converted, labels are kept
+            size += n_elements * itemsize
+
+        for table in profile["tables"]:
+            size += table["n_rows"] * sum(table["column_sizes"])
+
+        return size
+
+
+    def _preprocessed_dtype(self, metadata: Dict) -> Optional[np.dtype]:
+        """
+        Get the dtype of the preprocessed features, or None if they keep their original dtype.
+        """
+        data_types = metadata.get("preprocessed", {}).get("data_types")
+        if data_types:
+            return max((np.dtype(name) for name in data_types), key=lambda d: d.itemsize)
+        if metadata.get("type") == "image" and metadata.get("normalize_on_load"):
+            return None                 # uint8 images are kept and normalized in training
+        if metadata.get("type") == "image" and not metadata.get("normalized"):
+            return np.dtype("float64")  # x / 255.0 promotes to float64
+        return None
+
+
+    def _read_npy_header(self, path: Path) -> Dict:
+        """
+        Read the shape and dtype of a NumPy array from its header.
+        """
+        with open(path, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        return {"shape": list(shape), "dtype": dtype.str}
+
+
+    def _sample_csv(self, path: Path) -> Optional[Dict]:
+        """
+        Sample the first rows of a CSV file to infer the in-memory size of each column,
+        and count the rows of the whole file.
+        """
+        try:
+            with open(path, "r", newline="") as f:
+                lines = [line for _, line in zip(range(self.sample_rows + 1), f)]
+        except (UnicodeDecodeError, OSError):
+            return None
+        if not lines:
+            return None
+
+        sample = "".join(lines)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+            has_header = csv.Sniffer().has_header(sample)
+        except csv.Error:
+            dialect, has_header = csv.excel, False
+
+        rows = list(csv.reader(lines, dialect))
+        if has_header:
+            rows = rows[1:]
+            sample = "".join(lines[1:])
+        if not rows:
+            return None
+
+        n_columns = max(len(row) for row in rows)
+        columns = [[row[i] for row in rows if i < len(row)] for i in range(n_columns)]
+        return {
+            "n_rows": self._count_rows(path) - int(has_header),
+            "column_sizes": [self._column_size(values) for values in columns]
+        }
+
+
+    def _count_rows(self, path: Path) -> int:
+        """
+        Count the lines of a file, reading it in chunks without parsing it.
+        """
+        n_lines = 0
+        last = b"\n"
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                n_lines += chunk.count(b"\n")
+                last = chunk[-1:]
+        return n_lines + (last != b"\n")    # last line without a newline
+
+
+    def _column_size(self, values: List[str]) -> int:
+        """
+        Estimate the average in-memory size of a value of a column parsed by pandas.
+        """
+        try:
+            for value in values:
+                if value.strip():
+                    float(value)
+            return NUMERIC_SIZE
+        except ValueError:
+            average = sum(sys.getsizeof(value) for value in values) / len(values)
+            return POINTER_SIZE + int(average)
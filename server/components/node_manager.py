@@ -1,63 +1,84 @@
-import requests
-from typing import List, Dict
-from kubernetes import config, client
+import hashlib
+from typing import List, Dict, Set, Tuple, Optional
+from loguru import logger
 
-from server.settings import DEBUG, KUBE_CONFIG, PROMETHEUS_URL, NODE_EXPORTER_PORT, KUBE_APISERVER_PORT
+from server.node_sources import NodeSourceInterface, KubeNodeSource, FileNodeSource
+from server.settings import (
+    NODE_SOURCE,
+    REGISTRY_BANDWIDTH,
+    OBJECT_STORE_BANDWIDTH,
+    DEFAULT_IMAGE_SIZE,
+    CORE_GFLOPS,
+    ACCELERATOR_SPEEDUP
+)
+
+
+node_sources = {
+    "kubernetes": KubeNodeSource,
+    "file": FileNodeSource,
+}
 
 
 class NodeManager:
 
-    def __init__(self):
-        self._load_kube_config()
-        self.kube_client = client.CoreV1Api()
+    def __init__(self, node_source: Optional[NodeSourceInterface] = None):
+        self.node_source = node_source or node_sources[NODE_SOURCE]()
         self.nodes: Dict[str, Dict] = {}
         self.occupation: Dict[str, str] = {}
+        self.pending: Dict[str, str] = {}       # node -> pipeline it is handed over to once released
+        self.draining: Set[str] = set()         # cordoned nodes, finishing their components
+        self.prepulls: Dict[Tuple[str, str], str] = {}
+        self.reservations: Dict[str, Dict[str, int]] = {}
+        self.remaining_times: Dict[str, float] = {}
 
         self._fetch_nodes()
         self._initialize_occupation()
 
 
-    def _load_kube_config(self) -> None:
+    def _fetch_nodes(self) -> None:
         """
-        Load Kubernetes configuration depending on DEBUG flag.
+        Fetch and update metadata and metrics for all worker nodes from the node source.
+        Nodes may join or leave the cluster at any time, and cordoned nodes are drained.
+        The last known nodes are kept if the node source cannot be read.
         """
-        if DEBUG:
-            config.load_kube_config(config_file=KUBE_CONFIG)
-        else:
-            config.load_incluster_config()
-
-
-    def _fetch_nodes(self) -> None:
+        try:
+            listed = list(self.node_source.list_nodes())
+        except Exception as e:
+            logger.error(f"Error while fetching nodes, keeping the last known nodes: {e}")
+            return
+
+        known = set(self.nodes)
+        nodes = {}
+        draining = set()
+        for node in listed:
+            if node.pop("draining", False):
+                draining.add(node["name"])
+            nodes[node["name"]] = node
+
+        self.nodes = nodes
+        for node_name in draining - self.draining:
+            logger.info(f"Node {node_name} cordoned, draining")
+        self.draining = draining
+        if known:
+            for node_name in set(nodes) - known:
+                logger.info(f"Node {node_name} joined the cluster")
+                self.occupation.setdefault(node_name, None)
+            for node_name in known - set(nodes):
+                logger.info(f"Node {node_name} left the cluster")
+                self._forget_node(node_name)
+
+        self._clean_prepulls()
+
+
+    def _forget_node(self, node_name: str) -> None:
         """
-        Fetch and update metadata and metrics for all agent worker nodes.
+        Drop the state of a node that left the cluster, once no pipeline holds it.
         """
-        nodes_response = self.kube_client.list_node()
-
-        for node in nodes_response.items:
-            annotations = node.metadata.annotations.get("k3s.io/node-args", "")
-            conditions = node.status.conditions
-            if "agent" not in annotations or not self._is_node_ready(conditions):
-                continue
-
-            node_name = node.metadata.name
-            node_ip = node.status.addresses[0].address
-            labels = node.metadata.labels
-            info = node.status.node_info
-            memory = int(node.status.allocatable["memory"][:-2])
-            self.nodes[node_name] = {
-                "name": node_name,
-                "worker_type": labels.get("worker_type"),
-                "ip": node_ip,
-                "os": info.operating_system,
-                "os_image": info.os_image,
-                "kernel_version": info.kernel_version,
-                "architecture": info.architecture,
-                "cpu_cores": int(node.status.allocatable["cpu"]),
-                "n_cpu_flags": int(labels.get("n_cpu_flags", 0)),
-                "memory": memory,
-                "memory_usage": self._get_memory_usage(node_ip, memory),
-                "accelerator": labels.get("accelerator_type")
-            }
+        if node_name in self.nodes or self.occupation.get(node_name) is not None:
+            return
+        self.occupation.pop(node_name, None)
+        self.pending.pop(node_name, None)
+        self.reservations.pop(node_name, None)
 
 
     def _initialize_occupation(self) -> None:
@@ -67,67 +88,6 @@ class NodeManager:
         self.occupation = {node_name: None for node_name in self.nodes}
 
 
-    def _get_memory_usage(self, node_ip: str, total_memory: int) -> float:
-        """
-        Analyze memory usage on the node.
-        """
-        free_memory_avg = self._get_free_memory_avg(node_ip)
-        kfp_memory_usage_avg = self._get_kfp_memory_usage_avg(node_ip)
-        memory_usage_no_kfp = total_memory - free_memory_avg - kfp_memory_usage_avg
-        memory_usage = memory_usage_no_kfp / total_memory
-        return round(memory_usage, 2)
-    
-
-    def _is_node_ready(self, conditions: List) -> bool:
-        """
-        Check if the node is ready based on its conditions.
-        """
-        for condition in conditions:
-            if condition.type == "Ready":
-                return bool(condition.status)
-        return False
-        
-
-    def _get_prometheus_metric(self, query: str) -> int:
-        """
-        Query Prometheus and return the result value.
-        """
-        response = requests.get(PROMETHEUS_URL, params={"query": query}).json()
-        try:
-            result = response["data"]["result"][0]
-            return int(result["value"][1])
-        except (IndexError, KeyError, ValueError):
-            return 0
-
-
-    def _get_free_memory_avg(self, node_ip: str) -> int:
-        """
-        Calculate average free memory (in KB) for a node (over 5 minutes).
-        """
-        instance = f"{node_ip}:{NODE_EXPORTER_PORT}"
-        query = (
-            f'round('
-            f'avg_over_time(node_memory_MemAvailable_bytes{{instance="{instance}"}}[5m:]) '
-            f'/ 1024)'
-        )   
-        return self._get_prometheus_metric(query)
-
-
-    def _get_kfp_memory_usage_avg(self, node_ip: str) -> int:
-        """
-        Calculate average memory usage (in KB) for KFP containers on a node (over 5 minutes).
-        """
-        instance = f"{node_ip}:{KUBE_APISERVER_PORT}"
-        query = (
-            f'round('
-            f'avg_over_time('
-            f'sum by (instance) (container_memory_usage_bytes{{namespace="kubeflow", instance="{instance}", container!=""}})[5m:]'
-            f') / 1024'
-            f')'
-        )
-        return self._get_prometheus_metric(query)
-
-
     def update_nodes(self) -> None:
         """
         Update nodes metadata and metrics.
@@ -149,13 +109,13 @@ class NodeManager:
         descending: bool = False
     ) -> List[Dict]:
         """
-        Get nodes and their details, optionally filtered and sorted.
+        Get the schedulable nodes (not draining) and their details, optionally filtered and sorted.
         """
-        nodes = list(self.nodes.values())
+        nodes = [node for node in self.nodes.values() if node["name"] not in self.draining]
 
         # Apply filters
         if filters:
-            for node in self.nodes.values():
+            for node in nodes.copy():
                 for k, v in filters.items():
                     if (isinstance(v, list) and node[k] not in v) or (not isinstance(v, list) and node[k] != v):
                         nodes.remove(node)
@@ -172,9 +132,19 @@ class NodeManager:
 
     def nodes_available(self, node_names: List[str]) -> bool:
         """
-        Check if all nodes in the list are available.
+        Check if all nodes in the list are available: schedulable, and neither reserved nor promised to a pipeline.
+        """
+        return all([
+            self.is_schedulable(node) and self.occupation.get(node) is None and node not in self.pending
+            for node in node_names
+        ])
+
+
+    def is_schedulable(self, node: str) -> bool:
+        """
+        Check if a node is in the cluster and not draining.
         """
-        return all([self.occupation[node] is None for node in node_names])
+        return node in self.nodes and node not in self.draining
 
 
     def reserve_nodes(self, node_names: List[str], pipeline_id: str) -> None:
@@ -187,11 +157,184 @@ class NodeManager:
 
     def release_nodes(self, node_names: List[str], pipeline_id: str) -> None:
         """
-        Mark nodes as released (available again).
+        Mark nodes as released (available again), or hand them over to the pipeline they are promised to.
         """
         for node in node_names:
-            if self.occupation[node] == pipeline_id:
-                self.occupation[node] = None
+            if self.pending.get(node) == pipeline_id:
+                del self.pending[node]
+            if self.occupation.get(node) == pipeline_id:
+                self.occupation[node] = self.pending.pop(node, None)
+            if node not in self.nodes:
+                self._forget_node(node)
+
+
+    def reserve_pending(self, node_names: List[str], pipeline_id: str) -> None:
+        """
+        Promise busy nodes to a pipeline, which reserves them as soon as they are released.
+        """
+        for node in node_names:
+            self.pending[node] = pipeline_id
+
+
+    def drain_node(self, node: str) -> bool:
+        """
+        Cordon a node, so no new components are placed on it while its running components finish.
+        """
+        return self._set_unschedulable(node, True)
+
+
+    def uncordon_node(self, node: str) -> bool:
+        """
+        Make a drained node schedulable again.
+        """
+        return self._set_unschedulable(node, False)
+
+
+    def _set_unschedulable(self, node: str, unschedulable: bool) -> bool:
+        """
+        Set the unschedulable (cordon) flag of a node in the node source.
+        """
+        if node not in self.nodes:
+            return False
+        try:
+            self.node_source.set_unschedulable(node, unschedulable)
+        except Exception as e:
+            logger.error(f"Error cordoning node {node}: {e}")
+            return False
+        if unschedulable:
+            self.draining.add(node)
+        else:
+            self.draining.discard(node)
+        logger.info(f"Node {node} {'cordoned, draining' if unschedulable else 'uncordoned'}")
+        return True
+
+
+    def reserve_memory(self, node: str, component_id: str, size: int) -> None:
+        """
+        Reserve memory (in kilobytes) on a node for a component placed but not finished yet.
+        """
+        self.reservations.setdefault(node, {})[component_id] = size
+
+
+    def get_reserved_memory(self, node: str, component_id: str) -> Optional[int]:
+        """
+        Get the memory (in kilobytes) reserved on a node for a component, if any.
+        """
+        return self.reservations.get(node, {}).get(component_id)
+
+
+    def release_memory(self, node: str, component_id: str) -> None:
+        """
+        Release the memory reserved on a node for a component.
+        """
+        self.reservations.get(node, {}).pop(component_id, None)
+
+
+    def get_free_memory(self, node: str, reserved: bool = True) -> float:
+        """
+        Get the free memory (in kilobytes) of a node, minus the memory reserved
+        for the components placed on it unless `reserved` is False.
+        """
+        details = self.nodes[node]
+        memory = details["memory"]
+        memory_free = memory - (memory * details["memory_usage"])
+        if reserved:
+            memory_free -= sum(self.reservations.get(node, {}).values())
+        return memory_free
+
+
+    def estimate_duration(self, node: str, effort: int) -> float:
+        """
+        Estimate the time (in seconds) a node takes to complete an effort (in FLOPs).
+        """
+        details = self.nodes[node]
+        flops = details["cpu_cores"] * CORE_GFLOPS * 1e9
+        if details["accelerator"] != "none":
+            flops *= ACCELERATOR_SPEEDUP
+        return effort / flops
+
+
+    def set_remaining_times(self, times: Dict[str, float]) -> None:
+        """
+        Set the predicted remaining time (in seconds) of the components of the running pipelines.
+        """
+        self.remaining_times = times
+
+
+    def get_remaining_time(self, component_id: str) -> Optional[float]:
+        """
+        Get the predicted remaining time (in seconds) of a component, or None if it is not running.
+        """
+        return self.remaining_times.get(component_id)
+
+
+    def transfer_time(self, src: str, dst: str, size: int) -> float:
+        """
+        Estimate the time (in seconds) to move an artifact of the given size (in kilobytes) between two nodes.
+        KFP artifacts always go through the object store, so the artifact is uploaded by the source node
+        and downloaded by the destination node, even when both are the same node.
+        """
+        return self.object_store_time(src, size) + self.object_store_time(dst, size)
+
+
+    def object_store_time(self, node: str, size: int) -> float:
+        """
+        Estimate the time (in seconds) a node takes to upload or download an artifact of the given size
+        (in kilobytes) to or from the object store, bounded by the slower of its link and the store (in Mbit/s).
+        """
+        bandwidth = min(self.nodes[node]["bandwidth"], OBJECT_STORE_BANDWIDTH)
+        return size * 1024 * 8 / (bandwidth * 1e6)
+
+
+    def has_image(self, node: str, image: str) -> bool:
+        """
+        Check if an image is already present on a node.
+        """
+        return image in self.nodes[node]["images"]
+
+
+    def pull_time(self, node: str, image: str) -> float:
+        """
+        Estimate the time (in seconds) a node takes to pull an image, zero if already present.
+        The image size is taken from the nodes that have it, or assumed to be the default size.
+        """
+        if self.has_image(node, image):
+            return 0.0
+        sizes = [n["images"][image] for n in self.nodes.values() if image in n["images"]]
+        size = max(sizes) if sizes else DEFAULT_IMAGE_SIZE * 1024 * 1024
+        bandwidth = min(self.nodes[node]["bandwidth"], REGISTRY_BANDWIDTH)
+        return size * 8 / (bandwidth * 1e6)
+
+
+    def prepull_image(self, node: str, image: str) -> None:
+        """
+        Warm an image on a node ahead of its tasks, with a pre-pull task of the node source.
+        """
+        if self.has_image(node, image) or (node, image) in self.prepulls:
+            return
+
+        digest = hashlib.sha256(f"{node}/{image}".encode()).hexdigest()[:12]
+        pod_name = f"prepull-{digest}"
+        try:
+            self.node_source.create_prepull(node, image, pod_name)
+            self.prepulls[(node, image)] = pod_name
+            logger.info(f"Pre-pulling image {image} on node {node}")
+        except Exception as e:
+            logger.error(f"Error pre-pulling image {image} on node {node}: {e}")
+
+
+    def _clean_prepulls(self) -> None:
+        """
+        Delete the pre-pull tasks whose images are now present on their nodes.
+        """
+        for (node, image), pod_name in list(self.prepulls.items()):
+            if node in self.nodes and not self.has_image(node, image):
+                continue
+            try:
+                self.node_source.delete_prepull(pod_name)
+            except Exception:
+                pass
+            del self.prepulls[(node, image)]
 
 
     def get_node_platform(self, node: str) -> str:
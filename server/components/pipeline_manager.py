@@ -1,20 +1,41 @@
 from queue import Queue
-from typing import List, Dict, Tuple
+from pathlib import Path
+from typing import List, Dict, Set, Tuple, Optional
 import time
 import subprocess
 import requests
 import json
 import csv
+import math
+import threading
+from datetime import datetime, timedelta
+from dateutil import tz
+from kfp import Client
 from loguru import logger
 
 from server.ml_pipeline import Pipeline, Component
-from server.components import DecisionUnit, NodeManager
+from server.components import DecisionUnit, NodeManager, TemplateCache, ArtifactCache, FairShareQueue
 from server.settings import (
     KFP_URL,
     KFP_API_ENDPOINT,
     ENABLE_CACHING,
+    PREPROCESSING_CACHE,
+    PREPULL_IMAGES,
+    ROLLING_HORIZON,
+    LATE_BINDING,
+    PREEMPTION,
+    STAGE_PIPELINING,
+    STAGE_PIPELINING_SLACK,
+    SERVER_URL,
+    SPECULATION,
+    SPECULATION_THRESHOLD,
+    SPECULATION_BUDGET,
+    DEFAULT_TENANT,
     PIPELINE_FILENAME,
-    KFP_PREFIX,
+    METADATA_FILENAME,
+    EPOCH_DATE,
+    KFP_PACKAGE_FILENAME,
+    KFP_SPECULATIVE_FILENAME,
     N_PIPELINES_CSV,
     pipelines_dir
 )
@@ -22,35 +43,72 @@ from server.settings import (
 
 class PipelineManager:
 
-    def __init__(self, decision_unit: DecisionUnit, node_manager: NodeManager):
+    def __init__(
+        self,
+        decision_unit: DecisionUnit,
+        node_manager: NodeManager,
+        template_cache: TemplateCache,
+        artifact_cache: ArtifactCache
+    ):
         self.decision_unit = decision_unit
         self.node_manager = node_manager
+        self.template_cache = template_cache
+        self.artifact_cache = artifact_cache
         self.kfp_url = KFP_URL
+        self.kfp_client = None
         self.pipelines: Dict[str, Pipeline] = {}
         self.submission_queue: Queue = Queue()
-        self.waiting_list: List[str] = []
+        self.waiting_list = FairShareQueue()
         self.running_pipelines: List[str] = []
         self.time_window = 0
-
+        self.lock = threading.Lock()    # placement and updates run in different scheduler threads
+        self.lazy_build = ROLLING_HORIZON or LATE_BINDING
+        self.enable_caching = ENABLE_CACHING or PREEMPTION or SPECULATION  # reruns and copies reuse completed stages
+        self.triggered_work = 0.0      # predicted service time of the triggered pipelines
+        self.speculative_work = 0.0    # predicted duration of the speculative copies
+        self.promised_releases: Dict[str, float] = {}  # promised node -> predicted release timestamp
+        self.stage_pipelining = STAGE_PIPELINING and SERVER_URL is not None     # gated stages poll the server
+        if STAGE_PIPELINING and SERVER_URL is None:
+            logger.error("SERVER_URL is required to gate the stages of pipelined runs, stage pipelining disabled")
         # Csv file to save total running and waiting pipelines
         self.csv_file = open(N_PIPELINES_CSV, "a", newline="")
         self.csv_writer = csv.writer(self.csv_file)
         self.csv_writer.writerow(["timestamp", "type", "running_pipelines", "waiting_pipelines"])
 
 
-    def add_pipeline(self, pipeline_id: str, name: str, components: List[Tuple[str, str]]) -> None:
+    def add_pipeline(
+        self,
+        pipeline_id: str,
+        name: str,
+        components: List[Tuple[str, str]],
+        priority: Optional[int] = None,
+        deadline: Optional[float] = None,
+        tenant: Optional[str] = None
+    ) -> None:
         """
         Register a new pipeline with its components.
+        The priority, deadline (in seconds after submission) and tenant default to the ones in the metadata.
         """
         logger.info(f"New pipeline with ID {pipeline_id}")
-        self.submission_queue.put(pipeline_id)
         pipeline = Pipeline(pipeline_id, name)
+        metadata = pipeline.get_metadata()
+        priority = metadata.get("priority", 0) if priority is None else priority
+        deadline = metadata.get("deadline") if deadline is None else deadline
+        tenant = tenant or metadata.get("tenant") or DEFAULT_TENANT
+        pipeline.update(priority=int(priority), tenant=tenant)
+        if deadline is not None:
+            pipeline.update(deadline=pipeline.submitted_at + timedelta(seconds=float(deadline)))
         
         for filename, name in components:
             component = Component(name, filename)
             pipeline.add_component(component)
 
+        path = pipelines_dir / pipeline_id
+        files = [path / PIPELINE_FILENAME, path / METADATA_FILENAME]
+        files.extend(path / c.filename for c in pipeline.get_components())
+        pipeline.update(template_key=TemplateCache.compute_key(files))
         self.pipelines[pipeline_id] = pipeline
+        self.submission_queue.put(pipeline_id)
 
     
     def get_pipeline(self, pipeline_id: str) -> Pipeline:
@@ -60,6 +118,48 @@ class PipelineManager:
         return self.pipelines.get(pipeline_id)
 
 
+    def get_metrics(self) -> Dict:
+        """
+        Get the waiting times and deadline misses of the pipelines, per priority class,
+        the share, usage and accounting of each tenant, and the work spent on speculative copies.
+        A deadline is missed if the pipeline finished after it, or is still unfinished past it.
+        """
+        now = datetime.now(tz=tz.tzutc())
+        classes = {}
+        for pipeline in list(self.pipelines.values()):
+            metrics = classes.setdefault(pipeline.priority, {
+                "submitted": 0, "finished": 0, "waiting_times": [], "deadlines": 0, "deadlines_missed": 0
+            })
+            metrics["submitted"] += 1
+            if pipeline.finished_at is not None:
+                metrics["finished"] += 1
+            if pipeline.scheduled_at is not None:
+                metrics["waiting_times"].append((pipeline.scheduled_at - pipeline.submitted_at).total_seconds())
+            if pipeline.deadline is not None:
+                metrics["deadlines"] += 1
+                if (pipeline.finished_at or now) > pipeline.deadline:
+                    metrics["deadlines_missed"] += 1
+
+        for metrics in classes.values():
+            waiting_times = metrics.pop("waiting_times")
+            metrics["avg_waiting_time"] = sum(waiting_times) / len(waiting_times) if waiting_times else None
+            metrics["deadline_miss_rate"] = (
+                metrics["deadlines_missed"] / metrics["deadlines"] if metrics["deadlines"] else None
+            )
+
+        return {
+            "running_pipelines": len(self.running_pipelines),
+            "waiting_pipelines": len(self.waiting_list),
+            "priorities": {str(priority): classes[priority] for priority in sorted(classes, reverse=True)},
+            "tenants": self.waiting_list.get_metrics(),
+            "speculation": {
+                "copies": sum(pipeline.speculations for pipeline in list(self.pipelines.values())),
+                "speculative_work": self.speculative_work,
+                "triggered_work": self.triggered_work
+            }
+        }
+
+
     def dump_pipelines(self) -> None:
         """
         Dump the pipelines to a JSON file.
@@ -76,72 +176,634 @@ class PipelineManager:
     def process_pipelines(self) -> None:
         """
         Place and then build the pipelines in the submission queue.
+        With a rolling horizon, the pipelines still waiting are placed again along with them.
+        With a rolling horizon or late binding, pipelines are only built when triggered.
         """
-        if self.submission_queue.empty():
-            return
-        self.time_window += 1
-        self._add_csv_row(new_window=True)
+        with self.lock:
+            if self.submission_queue.empty() and not (ROLLING_HORIZON and self.waiting_list):
+                return
+            if not self.submission_queue.empty():
+                self.time_window += 1
+                self._add_csv_row(new_window=True)
         
-        pipelines_recv = []
-        while not self.submission_queue.empty():
-            pipeline_id = self.submission_queue.get()
-            pipeline = self.pipelines[pipeline_id]
-            pipeline.update(time_window=self.time_window)
-            pipelines_recv.append(pipeline)
+            pipelines_recv = self._release_waiting_pipelines() if ROLLING_HORIZON else []
+            while not self.submission_queue.empty():
+                pipeline_id = self.submission_queue.get()
+                pipeline = self.pipelines[pipeline_id]
+                pipeline.update(time_window=self.time_window)
+                pipelines_recv.append(pipeline)
+
+            for pipeline in pipelines_recv:
+                self._update_cache_keys(pipeline)
     
-        placements = self.decision_unit.get_placements(pipelines_recv)
-        logger.info(f"Total of {len(placements)} pipeline(s) scheduled and placed")
+            placements = self.decision_unit.get_placements(pipelines_recv)
+            logger.info(f"Total of {len(placements)} pipeline(s) scheduled and placed")
 
-        for placement in placements:
-            pipeline_id = placement.get("pipeline_id")
+            for placement in placements:
+                pipeline_id = placement.get("pipeline_id")
+                pipeline = self.pipelines[pipeline_id]
+                mapping = placement.get("mapping")
+                efforts = placement.get("efforts", {})
+                candidates = placement.get("candidates", {})
+                pipeline.update(effort=efforts.get("total", 0))
+
+                for c, node in mapping.items():
+                    name, platform = node
+                    pipeline.update_component(
+                        c, node=name, platform=platform, effort=efforts.get(c, 0), candidates=candidates.get(c, [])
+                    )
+
+                if not self.lazy_build:
+                    self._build_pipeline(pipeline_id, mapping)
+                    logger.info(f"Pipeline {pipeline_id} converted to Kubeflow format and compiled")
+                self.waiting_list.push(
+                    pipeline_id,
+                    self._predict_service(pipeline),
+                    pipeline.submitted_at.timestamp(),
+                    pipeline.priority,
+                    pipeline.deadline.timestamp() if pipeline.deadline is not None else None,
+                    pipeline.tenant,
+                    self._get_demand(pipeline)
+                )
+                self._prepull_images(pipeline)
+
+
+    def _requeue_unschedulable(self) -> None:
+        """
+        Requeue the waiting pipelines placed on nodes that left the cluster or are draining,
+        so that they are placed again on the schedulable nodes.
+        """
+        for pipeline_id in self.waiting_list.ordered():
             pipeline = self.pipelines[pipeline_id]
-            mapping = placement.get("mapping")
-            efforts = placement.get("efforts", {})
-            pipeline.update(effort=efforts.get("total", 0))
+            if all(self.node_manager.is_schedulable(c.node) for c in pipeline.get_components() if not c.cached):
+                continue
+            logger.info(f"Pipeline {pipeline_id} placed on unschedulable nodes, placing it again")
+            for c in pipeline.get_components():
+                self.decision_unit.rm_assignment(c.node, pipeline_id, c.name)
+            self.waiting_list.remove(pipeline_id)
+            self.submission_queue.put(pipeline_id)
 
-            for c, node in mapping.items():
-                name, platform = node
-                pipeline.update_component(c, node=name, platform=platform, effort=efforts.get(c, 0))
 
-            self._build_pipeline(pipeline_id, mapping)
-            logger.info(f"Pipeline {pipeline_id} converted to Kubeflow format and compiled")
-            self.waiting_list.append(pipeline_id)
+    def _release_waiting_pipelines(self) -> List[Pipeline]:
+        """
+        Remove the assignments (and memory reservations) of the waiting pipelines,
+        so they can be placed again, and return them in their waiting order.
+        """
+        pipelines = []
+        for pipeline_id in self.waiting_list.ordered():
+            pipeline = self.pipelines[pipeline_id]
+            for c in pipeline.get_components():
+                self.decision_unit.rm_assignment(c.node, pipeline_id, c.name)
+            pipelines.append(pipeline)
+        self.waiting_list.clear()
+        return pipelines
 
 
     def update_pipelines(self) -> None:
         """
         Update the status of running pipelines and check waiting pipelines.
         """
-        # Update running pipelines
-        kfp_runs = self._get_kfp_runs()
-        for pipeline_id in self.running_pipelines:
-            pipeline = self.pipelines[pipeline_id]
-            if pipeline.kfp_id is None:
-                self._update_kfp_id(pipeline)
-            if pipeline.kfp_id is None:
-                logger.info("Kfp id still unavailable for pipeline ", pipeline_id)
-                continue
-            
-            run_details = kfp_runs.get(pipeline.kfp_id)
-            if run_details is not None:
-                self._update_components(pipeline_id, run_details)
-                pipeline.update_kfp(run_details)
+        with self.lock:
+            self.decision_unit.update_nodes()
+
+            # Update running pipelines
+            kfp_runs = self._get_kfp_runs()
+            for pipeline_id in self.running_pipelines:
+                pipeline = self.pipelines[pipeline_id]
+                if pipeline.kfp_id is None:
+                    self._update_kfp_id(pipeline)
+                if pipeline.kfp_id is None:
+                    logger.info("Kfp id still unavailable for pipeline ", pipeline_id)
+                    continue
+
+                if pipeline.speculative_run is not None:
+                    self._resolve_speculation(pipeline, kfp_runs)
+                run_details = kfp_runs.get(pipeline.kfp_id)
+                if run_details is not None:
+                    self._update_components(pipeline_id, run_details)
+                    pipeline.update_kfp(run_details)
         
-        self._terminate_pipelines()
+            self._terminate_pipelines()
 
-        # Check for new pipeline to be executed
-        for pipeline_id in self.waiting_list.copy():
-            pipeline = self.pipelines[pipeline_id]
-            nodes_required = [c.node for c in pipeline.get_components()]
+            self._requeue_unschedulable()
 
-            if self.node_manager.nodes_available(nodes_required):
-                self.node_manager.reserve_nodes(nodes_required, pipeline_id)
+            self._update_remaining_times()
+
+            if self.stage_pipelining:
+                self._check_promises()
+
+            self._update_tenant_usage()
+
+            # Check for new pipeline to be executed
+            starving = self.waiting_list.starving()
+            held = set()    # nodes kept free for the starving pipelines
+            for pipeline_id in self.waiting_list:
+                if not PREEMPTION and not self._has_free_nodes(held):
+                    break
+                pipeline = self.pipelines[pipeline_id]
+                nodes_required = [c.node for c in pipeline.get_components() if not c.cached]
+                if LATE_BINDING and not self.node_manager.nodes_available(nodes_required):
+                    nodes_required = self._bind_pipeline(pipeline)
+                binding, victims = {}, set()
+                if PREEMPTION and not self.node_manager.nodes_available(nodes_required):
+                    binding, victims = self._preempt_for(pipeline)
+                    if binding:
+                        nodes_required = [node for node, _ in binding.values()]
+                if held.intersection(nodes_required):
+                    continue
+
+                pending = []
+                if not binding and not self.node_manager.nodes_available(nodes_required):
+                    pending = self._get_pipelined_nodes(pipeline) if self.stage_pipelining else None
+                    if pending is None:
+                        if pipeline_id in starving:
+                            held.update(nodes_required)
+                        continue
+                demand = self._get_demand(pipeline, binding)
+                if not self.waiting_list.within_quota(pipeline_id, demand):
+                    continue
+
+                if binding and not self._preempt_pipelines(pipeline, binding, victims):
+                    continue
+                self.node_manager.reserve_nodes([n for n in nodes_required if n not in pending], pipeline_id)
+                if pending:
+                    self.node_manager.reserve_pending(pending, pipeline_id)
+                    for node in pending:
+                        self.promised_releases[node] = time.time() + self._predict_release_time(node)
+                    logger.info(f"Pipeline {pipeline_id} triggered before nodes {pending} are released")
+                if self.lazy_build:
+                    mapping = {c.name: (c.node, c.platform) for c in pipeline.get_components()}
+                    self._build_pipeline(pipeline_id, mapping)
+                    logger.info(f"Pipeline {pipeline_id} converted to Kubeflow format and compiled")
+                if pending:
+                    self._set_gates(pipeline, pipelines_dir / pipeline_id / KFP_PACKAGE_FILENAME)
                 logger.info(f"Pipeline {pipeline_id} triggered for execution")
                 self._run_pipeline(pipeline_id)
                 self.running_pipelines.append(pipeline_id)
                 self.waiting_list.remove(pipeline_id)
+                self.waiting_list.add_usage(pipeline.tenant, demand)
+                self.triggered_work += self._predict_service(pipeline)
+
+            if SPECULATION:
+                self._speculate_stragglers()
 
-        self._add_csv_row()
+            self._add_csv_row()
+
+
+    def _has_free_nodes(self, held: Set[str]) -> bool:
+        """
+        Check if any node is free for the waiting pipelines, other than the nodes held for the starving ones.
+        """
+        return any(
+            node not in held and self.node_manager.nodes_available([node]) for node in self.node_manager.nodes
+        )
+
+
+    def _predict_service(self, pipeline: Pipeline) -> float:
+        """
+        Predict the service time (in seconds) of a pipeline on the nodes it is placed on.
+        """
+        service = 0.0
+        for c in pipeline.get_components():
+            if not c.cached and self.node_manager.get_node_by_name(c.node) is not None:
+                service += self.node_manager.estimate_duration(c.node, c.effort or 0)
+        return service
+
+
+    def _get_demand(
+        self,
+        pipeline: Pipeline,
+        binding: Optional[Dict[str, Tuple[str, str]]] = None
+    ) -> Tuple[int, int]:
+        """
+        Get the nodes and the memory (in KB) reserved for the unfinished components of a pipeline,
+        on the nodes they are placed on or, if given, bound to.
+        """
+        binding = binding or {}
+        nodes = set()
+        memory = 0
+        for c in pipeline.get_components():
+            if c.cached or c.state == "SUCCEEDED":
+                continue
+            nodes.add(binding.get(c.name, (c.node, c.platform))[0])
+            memory += self.node_manager.get_reserved_memory(c.node, f"{pipeline.id}/{c.name}") or 0
+        return (len(nodes), memory)
+
+
+    def _update_tenant_usage(self) -> None:
+        """
+        Update the nodes and memory (in KB) used by each tenant with its running pipelines.
+        """
+        usage = {}
+        for pipeline_id in self.node_manager.occupation.values():
+            if pipeline_id in self.pipelines:
+                usage.setdefault(self.pipelines[pipeline_id].tenant, [0, 0])[0] += 1
+        for pipeline_id in self.running_pipelines:
+            pipeline = self.pipelines[pipeline_id]
+            usage.setdefault(pipeline.tenant, [0, 0])[1] += self._get_demand(pipeline)[1]
+
+        nodes = self.node_manager.get_nodes()
+        self.waiting_list.update_usage(usage, (len(nodes), sum(node["memory"] for node in nodes)))
+
+
+    def _bind_pipeline(self, pipeline: Pipeline) -> List[str]:
+        """
+        Bind the components of a waiting pipeline to the best ranked candidates that are free,
+        moving their assignments. Components keep their node if free, or else follow the other
+        components of the pipeline when possible, to preserve data locality. Candidates other than
+        their own node need enough free memory for the reservation moved to them.
+        The pipeline is left as placed unless all components can be bound.
+        Return the nodes required by the pipeline.
+        """
+        components = [c for c in pipeline.get_components() if not c.cached]
+        binding = {}
+        moved = {}      # memory (in KB) moved to each node by the binding
+        for c in components:
+            size = self.node_manager.get_reserved_memory(c.node, f"{pipeline.id}/{c.name}") or 0
+            free = [
+                (node, platform) for node, platform in c.candidates or [(c.node, c.platform)]
+                if self.node_manager.nodes_available([node]) and (
+                    node == c.node or self.node_manager.get_free_memory(node) >= moved.get(node, 0) + size
+                )
+            ]
+            if not free:
+                return [c.node for c in components]
+            bound = [b for b in free if b[0] == c.node or b in binding.values()]
+            binding[c.name] = bound[0] if bound else free[0]
+            node = binding[c.name][0]
+            if node != c.node:
+                moved[node] = moved.get(node, 0) + size
+
+        for c in components:
+            node, platform = binding[c.name]
+            if node != c.node:
+                logger.info(f"Component {c.name} of pipeline {pipeline.id} bound to node {node} instead of {c.node}")
+                self.decision_unit.move_assignment(c.node, node, pipeline.id, c.name)
+                pipeline.update_component(c.name, node=node, platform=platform)
+        return [c.node for c in components]
+
+
+    def _get_pipelined_nodes(self, pipeline: Pipeline) -> Optional[List[str]]:
+        """
+        Check if a pipeline can be triggered before all its nodes are free, with the stages placed
+        on the nodes still busy gated until the nodes are handed over to it. A busy node can be promised to the pipeline if it is not
+        promised to another one, and its occupant is predicted to release it before the stage that
+        needs it starts (by STAGE_PIPELINING_SLACK seconds), after the predicted durations of the preceding stages.
+        The first stage needs a free node. Return the busy nodes, or None if the pipeline cannot start.
+        """
+        busy = []
+        start = 0.0
+        for c in pipeline.get_components():
+            if c.cached:
+                continue
+            if c.node not in busy and not self.node_manager.nodes_available([c.node]):
+                occupant = self.node_manager.occupation.get(c.node)
+                if occupant == pipeline.id or c.node in self.node_manager.pending:
+                    return None
+                if start <= 0 or self._predict_release_time(c.node) + STAGE_PIPELINING_SLACK > start:
+                    return None
+                busy.append(c.node)
+            start += self.node_manager.estimate_duration(c.node, c.effort or 0)
+        return busy
+
+
+    def _set_gates(self, pipeline: Pipeline, package_path: Path) -> None:
+        """
+        Gate the components of a pipeline placed on the nodes promised to it, in its package,
+        so that they only start once the nodes are handed over to it.
+        """
+        gates = {
+            c.name: f"{SERVER_URL}/nodes/{c.node}/handover/{pipeline.id}"
+            for c in pipeline.get_components()
+            if not c.cached and self.node_manager.pending.get(c.node) == pipeline.id
+        }
+        if gates:
+            self.template_cache.set_gates(package_path, gates)
+
+
+    def _check_promises(self) -> None:
+        """
+        Warn about the promised nodes not released by STAGE_PIPELINING_SLACK seconds after their predicted
+        release, since the gated stages they are promised to are held back longer than predicted.
+        Each overdue promise is reported once.
+        """
+        now = time.time()
+        for node, release in list(self.promised_releases.items()):
+            pipeline_id = self.node_manager.pending.get(node)
+            if pipeline_id is None:
+                del self.promised_releases[node]
+            elif now > release + STAGE_PIPELINING_SLACK:
+                logger.warning(
+                    f"Node {node} promised to pipeline {pipeline_id} not released "
+                    f"{now - release:.0f}s after its predicted release"
+                )
+                del self.promised_releases[node]
+
+
+    def _predict_release_time(self, node: str) -> float:
+        """
+        Predict when (in seconds from now) the running pipeline that reserved a node releases it:
+        once its last component on the node finishes, its components running one after another.
+        """
+        pipeline_id = self.node_manager.occupation.get(node)
+        if pipeline_id not in self.running_pipelines:
+            return math.inf
+
+        finish = 0.0
+        release = 0.0
+        for c in self.pipelines[pipeline_id].get_components():
+            if c.cached or c.state == "SUCCEEDED":
+                continue
+            remaining = self.node_manager.get_remaining_time(f"{pipeline_id}/{c.name}")
+            finish += remaining if remaining is not None else math.inf
+            if c.node == node:
+                release = finish
+        return release
+
+
+    def _preempt_for(self, pipeline: Pipeline) -> Tuple[Dict[str, Tuple[str, str]], Set[str]]:
+        """
+        Find the running pipelines of lower priority to preempt for a waiting pipeline, without preempting them.
+        Each component is bound to the candidate node with the lowest preemption cost (free nodes first).
+        Return the binding of the components to nodes and platforms, and the pipelines holding those nodes,
+        or nothing unless all components can be bound.
+        """
+        components = [c for c in pipeline.get_components() if not c.cached]
+        binding = {}
+        for c in components:
+            costs = [
+                (self._get_preemption_cost(node, pipeline.priority), node, platform)
+                for node, platform in c.candidates or [(c.node, c.platform)]
+            ]
+            cost, node, platform = min(costs, key=lambda x: x[0])
+            if cost == math.inf:
+                return {}, set()
+            binding[c.name] = (node, platform)
+
+        victims = {self.node_manager.occupation.get(node) for node, _ in binding.values()} - {None}
+        return binding, victims
+
+
+    def _preempt_pipelines(
+        self,
+        pipeline: Pipeline,
+        binding: Dict[str, Tuple[str, str]],
+        victims: Set[str]
+    ) -> bool:
+        """
+        Preempt the pipelines holding the nodes a waiting pipeline is bound to, and move its components there.
+        The components are not moved unless all the pipelines are preempted.
+        Return whether the nodes were freed.
+        """
+        preempted = True
+        for victim in victims:
+            if self._preempt_pipeline(victim):
+                logger.info(f"Pipeline {victim} preempted for pipeline {pipeline.id}")
+            else:
+                preempted = False
+        if not preempted:
+            return False
+
+        for c in pipeline.get_components():
+            if c.name not in binding:
+                continue
+            node, platform = binding[c.name]
+            if node != c.node:
+                self.decision_unit.move_assignment(c.node, node, pipeline.id, c.name)
+                pipeline.update_component(c.name, node=node, platform=platform)
+        return True
+
+
+    def _get_preemption_cost(self, node: str, priority: int) -> float:
+        """
+        Get the cost (in seconds of lost work) of freeing a node for a pipeline of the given priority.
+        Only running pipelines of lower priority can be preempted, on schedulable nodes not promised to another pipeline.
+        """
+        if not self.node_manager.is_schedulable(node) or node in self.node_manager.pending:
+            return math.inf
+        pipeline_id = self.node_manager.occupation.get(node)
+        if pipeline_id is None:
+            return 0.0
+        victim = self.pipelines.get(pipeline_id)
+        if victim is None or victim.kfp_id is None or pipeline_id not in self.running_pipelines:
+            return math.inf
+        if victim.priority >= priority:
+            return math.inf
+        return self._get_lost_work(victim)
+
+
+    def _get_lost_work(self, pipeline: Pipeline) -> float:
+        """
+        Estimate the work (in seconds) lost by preempting a pipeline, from the elapsed time of its
+        running components. Completed components are reused, and training components that checkpoint
+        (given a `checkpoint_dir` argument) lose at most the epoch in progress.
+        """
+        now = datetime.now(tz=tz.tzutc())
+        metadata = pipeline.get_metadata()
+        components_args = metadata.get("components_args", {})
+        n_epochs = metadata["model"].get("params", {}).get("n_epochs", 1)
+
+        lost = 0.0
+        for c in pipeline.get_components():
+            if c.state == "SUCCEEDED" or c.start_time is None or c.start_time <= EPOCH_DATE:
+                continue
+            if self.node_manager.get_node_by_name(c.node) is None:
+                continue
+            elapsed = (now - c.start_time).total_seconds()
+            if c.type == "training" and components_args.get(c.name, {}).get("checkpoint_dir"):
+                epoch = self.node_manager.estimate_duration(c.node, c.effort or 0) / max(n_epochs, 1)
+                elapsed = min(elapsed, epoch)
+            lost += max(elapsed, 0.0)
+        return lost
+
+
+    def _preempt_pipeline(self, pipeline_id: str) -> bool:
+        """
+        Terminate the KFP run of a pipeline and requeue it, with its completed components cached
+        if its runs are submitted with KFP caching enabled, so that their outputs are reused.
+        The pipeline keeps running, and its nodes, if its run cannot be terminated.
+        Return whether the pipeline was preempted.
+        """
+        pipeline = self.pipelines[pipeline_id]
+        try:
+            self._get_kfp_client().terminate_run(pipeline.kfp_id)
+        except Exception as e:
+            logger.error(f"Error while terminating pipeline {pipeline_id}: {e}")
+            return False
+
+        if pipeline.speculative_run is not None:
+            self._end_speculation(pipeline, copy_won=False)
+        self.running_pipelines.remove(pipeline_id)
+        for c in pipeline.get_components():
+            self.decision_unit.rm_assignment(c.node, pipeline_id, c.name)
+            self.node_manager.release_nodes([c.node], pipeline_id)
+            if c.state == "SUCCEEDED" and self.enable_caching:
+                c.cached = True
+            else:
+                pipeline.update_component(c.name, state=None, start_time=None, end_time=None, duration=None)
+
+        pipeline.update(kfp_id=None, state=None, preemptions=pipeline.preemptions + 1)
+        self.submission_queue.put(pipeline_id)
+        return True
+
+
+    def _speculate_stragglers(self) -> None:
+        """
+        Launch a speculative copy of the components running well beyond their predicted duration
+        (by a factor of SPECULATION_THRESHOLD) on a faster idle node, one per pipeline.
+        The predicted duration of all copies is kept within SPECULATION_BUDGET of the predicted
+        service time of the triggered pipelines.
+        """
+        now = datetime.now(tz=tz.tzutc())
+        for pipeline_id in self.running_pipelines:
+            pipeline = self.pipelines[pipeline_id]
+            if pipeline.speculative_run is not None or pipeline.kfp_id is None:
+                continue
+            for c in pipeline.get_components():
+                if c.state != "RUNNING" or c.start_time is None or c.start_time <= EPOCH_DATE:
+                    continue
+                if self.node_manager.get_node_by_name(c.node) is None:
+                    continue
+                expected = self.node_manager.estimate_duration(c.node, c.effort or 0)
+                elapsed = (now - c.start_time).total_seconds()
+                if expected <= 0 or elapsed <= SPECULATION_THRESHOLD * expected:
+                    continue
+
+                target = self._get_speculative_node(pipeline, c, expected)
+                if target is None:
+                    continue
+                node, platform, duration = target
+                if self.speculative_work + duration > SPECULATION_BUDGET * self.triggered_work:
+                    logger.info(f"Speculation budget exhausted for component {c.name} of pipeline {pipeline_id}")
+                    continue
+                if self._run_speculative_copy(pipeline, c, node, platform):
+                    self.speculative_work += duration
+                    break
+
+
+    def _get_speculative_node(
+        self,
+        pipeline: Pipeline,
+        component: Component,
+        expected: float
+    ) -> Optional[Tuple[str, str, float]]:
+        """
+        Get the free node predicted to run a straggling component the fastest, among its candidates
+        (or all nodes), if faster than the duration predicted on its own node. Like the candidates of
+        the custom placer, the node must be eligible under the heuristics of the placer and fit the memory
+        required by the component.
+        Return the node, its platform and the predicted duration, or None.
+        """
+        metadata = pipeline.get_metadata()
+        filters = self.decision_unit.get_node_filters(component.type, metadata)
+        size = self.decision_unit.data_manager.memory_required(metadata["dataset"], component.type)
+        eligible = {
+            node["name"] for node in self.node_manager.get_nodes(filters=filters)
+            if self.node_manager.get_free_memory(node["name"], reserved=False) > size
+        }
+
+        candidates = component.candidates or [
+            (node, self.node_manager.get_node_platform(node)) for node in eligible
+        ]
+        best = None
+        for node, platform in candidates:
+            if node == component.node or node not in eligible or not self.node_manager.nodes_available([node]):
+                continue
+            duration = self.node_manager.estimate_duration(node, component.effort or 0)
+            if duration < expected and (best is None or duration < best[2]):
+                best = (node, platform, duration)
+        return best
+
+
+    def _run_speculative_copy(self, pipeline: Pipeline, component: Component, node: str, platform: str) -> bool:
+        """
+        Run a copy of a pipeline with a straggling component mapped to another node, reserving it.
+        The copy is run with KFP caching enabled, so that the completed components are not run again.
+        """
+        mapping = {c.name: (c.node, c.platform) for c in pipeline.get_components()}
+        mapping[component.name] = (node, platform)
+        package_path = pipelines_dir / pipeline.id / KFP_SPECULATIVE_FILENAME
+        if not self.template_cache.render(pipeline.template_key, mapping, package_path):
+            logger.info(f"No template to run a speculative copy of pipeline {pipeline.id}")
+            return False
+        self._set_caching(pipeline, package_path)
+        self._set_gates(pipeline, package_path)
+
+        try:
+            run = self._get_kfp_client().create_run_from_pipeline_package(
+                pipeline_file=str(package_path),
+                enable_caching=None if PREPROCESSING_CACHE else self.enable_caching
+            )
+        except Exception as e:
+            logger.error(f"Error while running speculative copy of pipeline {pipeline.id}: {e}")
+            return False
+
+        self.node_manager.reserve_nodes([node], pipeline.id)
+        pipeline.update(
+            speculative_run={"kfp_id": run.run_id, "component": component.name, "node": node, "platform": platform},
+            speculations=pipeline.speculations + 1
+        )
+        logger.info(f"Speculative copy of component {component.name} of pipeline {pipeline.id} started on node {node}")
+        return True
+
+
+    def _resolve_speculation(self, pipeline: Pipeline, kfp_runs: Dict[str, Dict]) -> None:
+        """
+        Keep whichever run of a pipeline finishes its straggling component first and cancel the other.
+        The copy is also cancelled if it fails or if the original run finishes.
+        """
+        speculative_run = pipeline.speculative_run
+        original = kfp_runs.get(pipeline.kfp_id)
+        copy = kfp_runs.get(speculative_run["kfp_id"])
+        component = speculative_run["component"]
+
+        if original is not None and (
+            original["state"] in ["SUCCEEDED", "FAILED"] or self._get_task_state(original, component) == "SUCCEEDED"
+        ):
+            self._end_speculation(pipeline, copy_won=False)
+        elif copy is not None and self._get_task_state(copy, component) == "SUCCEEDED":
+            self._end_speculation(pipeline, copy_won=True)
+        elif copy is not None and copy["state"] == "FAILED":
+            self._end_speculation(pipeline, copy_won=False)
+
+
+    def _end_speculation(self, pipeline: Pipeline, copy_won: bool) -> None:
+        """
+        Cancel the losing run of a pipeline with a speculative copy. If the copy won, the pipeline
+        follows its run and the straggling component is moved to its node.
+        """
+        speculative_run = pipeline.speculative_run
+        loser = pipeline.kfp_id if copy_won else speculative_run["kfp_id"]
+        try:
+            self._get_kfp_client().terminate_run(loser)
+        except Exception as e:
+            logger.error(f"Error while terminating run {loser} of pipeline {pipeline.id}: {e}")
+        self.delete_run_kfp(loser)
+
+        node = speculative_run["node"]
+        if copy_won:
+            component = pipeline.get_component(speculative_run["component"])
+            old_node = component.node
+            self.decision_unit.move_assignment(old_node, node, pipeline.id, component.name)
+            pipeline.update_component(component.name, node=node, platform=speculative_run["platform"])
+            pipeline.update(kfp_id=speculative_run["kfp_id"])
+            if not self.decision_unit.is_node_needed(old_node, pipeline.id):
+                self.node_manager.release_nodes([old_node], pipeline.id)
+            logger.info(f"Speculative copy of component {component.name} of pipeline {pipeline.id} finished first")
+        else:
+            self.node_manager.release_nodes([node], pipeline.id)
+        pipeline.update(speculative_run=None)
+
+
+    def _get_task_state(self, run_details: Dict, component: str) -> Optional[str]:
+        """
+        Get the state of the task of a component in the run details returned by KFP API.
+        """
+        state = None
+        for task in run_details.get("run_details", {}).get("task_details", []):
+            if task["display_name"] == component:
+                state = task.get("state")
+        return state
 
 
     def _update_components(self, pipeline_id: str, run_details: Dict) -> None:
@@ -153,12 +815,36 @@ class PipelineManager:
         pipeline.update_components_kfp(task_details)
 
         for c in pipeline.get_components():
+            if c.state == "SUCCEEDED" and c.cache_key is not None:
+                self.artifact_cache.add(c.cache_key, pipeline_id, c.name)
+            if c.state == "SUCCEEDED" and c.type == "preprocessing" and not c.cached:
+                node = self.node_manager.get_node_by_name(c.node)
+                if node is not None:
+                    self.decision_unit.data_manager.mark_warm(node, pipeline.get_metadata()["dataset"])
             if c.state == "SUCCEEDED":
                 self.decision_unit.rm_assignment(c.node, pipeline_id, c.name)
                 if not self.decision_unit.is_node_needed(c.node, pipeline_id):
                     self.node_manager.release_nodes([c.node], pipeline_id)
 
 
+    def _update_remaining_times(self) -> None:
+        """
+        Predict the remaining time of the unfinished components of the running pipelines,
+        from their estimated duration on their node and the time elapsed since they started.
+        """
+        now = datetime.now(tz=tz.tzutc())
+        times = {}
+        for pipeline_id in self.running_pipelines:
+            for c in self.pipelines[pipeline_id].get_components():
+                if c.state == "SUCCEEDED" or c.cached or self.node_manager.get_node_by_name(c.node) is None:
+                    continue
+                duration = self.node_manager.estimate_duration(c.node, c.effort or 0)
+                if c.start_time is not None and c.start_time > EPOCH_DATE:
+                    duration -= (now - c.start_time).total_seconds()
+                times[f"{pipeline_id}/{c.name}"] = max(duration, 0.0)
+        self.node_manager.set_remaining_times(times)
+
+
     def _terminate_pipelines(self) -> None:
         """
         Terminate pipelines that are completed.
@@ -177,8 +863,15 @@ class PipelineManager:
     def _build_pipeline(self, pipeline_id: str, mapping: Dict[str, Tuple[str, str]]) -> None:
         """
         Build the pipeline using the provided mapping.
+        Pipelines with a cached template are only patched with the new mapping.
         """
         pipeline = self.pipelines[pipeline_id]
+        package_path = pipelines_dir / pipeline_id / KFP_PACKAGE_FILENAME
+        if self.template_cache.render(pipeline.template_key, mapping, package_path):
+            logger.info(f"Pipeline {pipeline_id} compiled from cached template")
+            self._set_caching(pipeline, package_path)
+            return
+
         path = pipelines_dir / pipeline_id / PIPELINE_FILENAME
         args = ["python3", path, "-u", self.kfp_url, "-m"]
 
@@ -188,7 +881,7 @@ class PipelineManager:
         mapping_arg_json = json.dumps(mapping_arg)
         args.append(mapping_arg_json)
 
-        if ENABLE_CACHING:
+        if self.enable_caching:
             args.append("-c")
 
         try:
@@ -196,6 +889,63 @@ class PipelineManager:
         except Exception as e:
             logger.error("Error while building pipeline:", e)
             pipeline.update(state="FAILED")
+            return
+
+        if package_path.exists():
+            self.template_cache.put(pipeline.template_key, package_path)
+            self._set_caching(pipeline, package_path)
+        else:
+            logger.error(f"Pipeline package not found for pipeline {pipeline_id}")
+
+
+    def _update_cache_keys(self, pipeline: Pipeline) -> None:
+        """
+        Look up the preprocessing components of the pipeline in the artifact cache.
+        Keys are computed at placement time, against the current dataset version.
+        """
+        if not PREPROCESSING_CACHE:
+            return
+
+        metadata = pipeline.get_metadata()
+        data_manager = self.decision_unit.data_manager
+        version = data_manager.get_dataset_version(metadata["dataset"]["name"])
+        if version is None:
+            return
+
+        components_args = metadata.get("components_args", {})
+        for c in pipeline.get_components():
+            if c.type != "preprocessing":
+                continue
+            with open(pipelines_dir / pipeline.id / c.filename, "rb") as f:
+                source = f.read()
+            cache_key = ArtifactCache.compute_key(version, source, components_args.get(c.name, {}))
+            c.cache_key = cache_key
+            c.cached = self.artifact_cache.has(cache_key)
+            if c.cached:
+                logger.info(f"Pipeline {pipeline.id} reuses cached artifacts of {c.name}")
+
+
+    def _set_caching(self, pipeline: Pipeline, package_path: Path) -> None:
+        """
+        Set the cache keys of the preprocessing tasks in the pipeline package.
+        """
+        if not PREPROCESSING_CACHE:
+            return
+        cache_keys = {c.name: c.cache_key for c in pipeline.get_components() if c.cache_key is not None}
+        self.template_cache.set_caching(package_path, cache_keys, self.enable_caching)
+
+
+    def _prepull_images(self, pipeline: Pipeline) -> None:
+        """
+        Warm the images of the pipeline on the nodes its components are placed on while it waits.
+        """
+        if not PREPULL_IMAGES:
+            return
+        images = pipeline.get_metadata().get("components_image", {})
+        for c in pipeline.get_components():
+            if c.cached or c.name not in images:
+                continue
+            self.node_manager.prepull_image(c.node, f"{images[c.name]}:{c.platform}")
 
 
     def _run_pipeline(self, pipeline_id: str) -> None:
@@ -203,24 +953,30 @@ class PipelineManager:
         Trigger the execution of the pipeline.
         """
         pipeline = self.pipelines[pipeline_id]
+        package_path = pipelines_dir / pipeline_id / KFP_PACKAGE_FILENAME
 
         try:
-            run = subprocess.run(
-                args=["python3", pipelines_dir / pipeline_id / f"{KFP_PREFIX}{PIPELINE_FILENAME}"],
-                capture_output=True,
-                cwd=pipelines_dir / pipeline_id
+            run = self._get_kfp_client().create_run_from_pipeline_package(
+                pipeline_file=str(package_path),
+                enable_caching=None if PREPROCESSING_CACHE else self.enable_caching
             )
-            output = run.stdout.decode("utf-8")
-            if "Run ID:" in output:
-                kfp_id = output.split("Run ID:")[-1].strip()
-                pipeline.update(kfp_id=kfp_id, state="RUNNING")
-                logger.info(f"Kubeflow started pipeline {pipeline_id}")
+            pipeline.update(kfp_id=run.run_id, state="RUNNING")
+            logger.info(f"Kubeflow started pipeline {pipeline_id}")
 
         except Exception as e:
             logger.error("Error while running pipeline:", e)
             pipeline.update(state="FAILED")
 
 
+    def _get_kfp_client(self) -> Client:
+        """
+        Get the KFP client, creating it on first use.
+        """
+        if self.kfp_client is None:
+            self.kfp_client = Client(host=self.kfp_url)
+        return self.kfp_client
+
+
     def _update_kfp_id(self, pipeline: Pipeline) -> None:
         """
         Extract the KFP ID of the pipeline from the KFP API.
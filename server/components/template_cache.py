@@ -0,0 +1,202 @@
+import os
+import shutil
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
+import yaml
+
+from server.settings import TEMPLATE_CACHE_SIZE, STAGE_GATE_IMAGE, UPDATE_INTERVAL, templates_dir
+
+
+NODE_SELECTOR_KEY = "kubernetes.io/hostname"
+
+
+class TemplateCache:
+
+    def __init__(self):
+        self.cache_dir = templates_dir
+        self.max_size = TEMPLATE_CACHE_SIZE
+        self.templates: OrderedDict[str, Path] = OrderedDict()
+        self._load_templates()
+
+
+    def _load_templates(self) -> None:
+        """
+        Load the templates already on disk, least recently used first.
+        """
+        paths = sorted(self.cache_dir.glob("*.yaml"), key=lambda p: p.stat().st_mtime)
+        for path in paths:
+            self.templates[path.stem] = path
+        self._evict()
+
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used templates until the cache fits its size.
+        """
+        while len(self.templates) > self.max_size:
+            _, path = self.templates.popitem(last=False)
+            path.unlink(missing_ok=True)
+
+
+    @staticmethod
+    def compute_key(files: List[Path]) -> str:
+        """
+        Compute the cache key of a pipeline from the content of its source files.
+        """
+        digest = hashlib.sha256()
+        for path in sorted(files, key=lambda p: p.name):
+            digest.update(path.name.encode())
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        return digest.hexdigest()
+
+
+    def has(self, key: str) -> bool:
+        """
+        Check if a compiled template exists for the given key.
+        """
+        return key in self.templates
+
+
+    def put(self, key: str, package_path: Path) -> None:
+        """
+        Store a compiled pipeline package as the template for the given key.
+        """
+        path = self.cache_dir / f"{key}.yaml"
+        shutil.copyfile(package_path, path)
+        self.templates[key] = path
+        self.templates.move_to_end(key)
+        self._evict()
+
+
+    def render(self, key: str, mapping: Dict[str, Tuple[str, str]], package_path: Path) -> bool:
+        """
+        Write the template for the given key to a package with the nodes and platforms of the mapping.
+        Returns False if the template is missing or does not match the mapping.
+        """
+        path = self.templates.get(key)
+        if path is None:
+            return False
+
+        with open(path, "r") as f:
+            pipeline_spec, platform_spec = self._split_documents(list(yaml.safe_load_all(f)))
+
+        executors = self._get_executors(pipeline_spec)
+        if not set(mapping).issubset(executors):
+            return False
+
+        for task, (node, platform) in mapping.items():
+            executor = executors[task]
+            self._patch_image(pipeline_spec, executor, platform)
+            self._patch_node_selector(platform_spec, executor, node)
+
+        documents = [pipeline_spec] + ([platform_spec] if platform_spec else [])
+        with open(package_path, "w") as f:
+            yaml.safe_dump_all(documents, f, sort_keys=False)
+
+        self.templates.move_to_end(key)
+        os.utime(path)
+        return True
+
+
+    def set_caching(self, package_path: Path, cache_keys: Dict[str, str], enable_caching: bool) -> None:
+        """
+        Set the caching options of the tasks of a pipeline package.
+        Tasks with a cache key are always cached under that key, the others follow `enable_caching`.
+        """
+        with open(package_path, "r") as f:
+            pipeline_spec, platform_spec = self._split_documents(list(yaml.safe_load_all(f)))
+
+        for task, task_spec in pipeline_spec["root"]["dag"]["tasks"].items():
+            caching_options = task_spec.setdefault("cachingOptions", {})
+            if task in cache_keys:
+                caching_options["enableCache"] = True
+                caching_options["cacheKey"] = cache_keys[task]
+            else:
+                caching_options["enableCache"] = enable_caching
+                caching_options.pop("cacheKey", None)
+
+        documents = [pipeline_spec] + ([platform_spec] if platform_spec else [])
+        with open(package_path, "w") as f:
+            yaml.safe_dump_all(documents, f, sort_keys=False)
+
+
+    def set_gates(self, package_path: Path, gates: Dict[str, str]) -> None:
+        """
+        Gate tasks of a pipeline package on a URL of the server. Each gated task depends on a wait task,
+        run on any node and never cached, that polls its URL until the server reports success.
+        """
+        with open(package_path, "r") as f:
+            pipeline_spec, platform_spec = self._split_documents(list(yaml.safe_load_all(f)))
+
+        tasks = pipeline_spec["root"]["dag"]["tasks"]
+        for task, url in gates.items():
+            if task not in tasks:
+                continue
+            gate = f"wait-{task}"
+            pipeline_spec["components"][f"comp-{gate}"] = {"executorLabel": f"exec-{gate}"}
+            pipeline_spec["deploymentSpec"]["executors"][f"exec-{gate}"] = {
+                "container": {
+                    "image": STAGE_GATE_IMAGE,
+                    "command": ["sh", "-c"],
+                    "args": [f"until curl -s '{url}' | grep -q '\"status\":\"success\"'; do sleep {UPDATE_INTERVAL}; done"]
+                }
+            }
+            tasks[gate] = {
+                "cachingOptions": {"enableCache": False},
+                "componentRef": {"name": f"comp-{gate}"},
+                "taskInfo": {"name": gate}
+            }
+            dependent_tasks = tasks[task].setdefault("dependentTasks", [])
+            if gate not in dependent_tasks:
+                dependent_tasks.append(gate)
+
+        documents = [pipeline_spec] + ([platform_spec] if platform_spec else [])
+        with open(package_path, "w") as f:
+            yaml.safe_dump_all(documents, f, sort_keys=False)
+
+
+    def _split_documents(self, documents: List[Dict]) -> Tuple[Dict, Optional[Dict]]:
+        """
+        Split the package documents into the pipeline spec and the platform spec.
+        """
+        pipeline_spec = documents[0]
+        platform_spec = documents[1] if len(documents) > 1 else None
+        return pipeline_spec, platform_spec
+
+
+    def _get_executors(self, pipeline_spec: Dict) -> Dict[str, str]:
+        """
+        Map each task of the pipeline to its executor label.
+        """
+        executors = {}
+        components = pipeline_spec["components"]
+        for task, task_spec in pipeline_spec["root"]["dag"]["tasks"].items():
+            component = components[task_spec["componentRef"]["name"]]
+            executors[task] = component["executorLabel"]
+        return executors
+
+
+    def _patch_image(self, pipeline_spec: Dict, executor: str, platform: str) -> None:
+        """
+        Replace the platform tag of the base image used by an executor.
+        """
+        container = pipeline_spec["deploymentSpec"]["executors"][executor]["container"]
+        image = container["image"]
+        name, sep, tag = image.rpartition(":")
+        if not sep or "/" in tag:
+            name = image
+        container["image"] = f"{name}:{platform}"
+
+
+    def _patch_node_selector(self, platform_spec: Optional[Dict], executor: str, node: str) -> None:
+        """
+        Replace the node selected for an executor.
+        """
+        if platform_spec is None:
+            return
+        executors = platform_spec["platforms"]["kubernetes"]["deploymentSpec"]["executors"]
+        node_selector = executors.setdefault(executor, {}).setdefault("nodeSelector", {})
+        node_selector.setdefault("labels", {})[NODE_SELECTOR_KEY] = node
@@ -0,0 +1,174 @@
+import math
+import time
+import heapq
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from server.settings import AGING_TIME, MAX_WAIT
+
+
+class WaitingQueue:
+
+    def __init__(self):
+        self.max_wait = MAX_WAIT
+        self.heap: List[Tuple] = []                     # (rank, seq, pipeline_id)
+        self.ages: List[Tuple[float, int, str]] = []    # (submitted_at, seq, pipeline_id)
+        self.latest_starts: List[Tuple[float, int, str]] = []   # (deadline - service, seq, pipeline_id)
+        self.entries: Dict[str, int] = {}               # pipeline_id -> seq of its live entries
+        self.details: Dict[str, Tuple[float, float, int]] = {}  # pipeline_id -> (service, submitted_at, priority)
+        self.seq = 0
+
+
+    @staticmethod
+    def priority(service: float, submitted_at: float) -> float:
+        """
+        Get the priority of a pipeline (lowest first) from its predicted service time (in seconds)
+        and its submission timestamp. Without aging, this is shortest job first.
+        With aging, the service time is discounted by a factor of e every AGING_TIME seconds of waiting:
+        log(s) - (now - a) / T orders pipelines the same as log(s) + a / T at any time,
+        so priorities never need to be recomputed.
+        """
+        if AGING_TIME <= 0:
+            return service
+        return math.log(max(service, 1e-3)) + submitted_at / AGING_TIME
+
+
+    @staticmethod
+    def rank(
+        service: float,
+        submitted_at: float,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        now: Optional[float] = None
+    ) -> Tuple[int, float, float]:
+        """
+        Get the rank of a pipeline (lowest first): by priority class, then earliest deadline first,
+        then by priority. Deadlines that can no longer be met given the predicted service time
+        are ignored, so they do not delay pipelines that can still meet theirs.
+        """
+        now = time.time() if now is None else now
+        if deadline is None or now + service > deadline:
+            deadline = math.inf
+        return (-priority, deadline, WaitingQueue.priority(service, submitted_at))
+
+
+    def push(
+        self,
+        pipeline_id: str,
+        service: float,
+        submitted_at: float,
+        priority: int = 0,
+        deadline: Optional[float] = None
+    ) -> None:
+        """
+        Add a pipeline to the queue, replacing its previous entry if any.
+        """
+        self.seq += 1
+        self.entries[pipeline_id] = self.seq
+        self.details[pipeline_id] = (service, submitted_at, priority)
+        rank = self.rank(service, submitted_at, priority, deadline)
+        heapq.heappush(self.heap, (rank, self.seq, pipeline_id))
+        heapq.heappush(self.ages, (submitted_at, self.seq, pipeline_id))
+        if rank[1] != math.inf:
+            heapq.heappush(self.latest_starts, (deadline - service, self.seq, pipeline_id))
+
+
+    def remove(self, pipeline_id: str) -> None:
+        """
+        Remove a pipeline from the queue. Its heap entries are deleted lazily.
+        """
+        self.entries.pop(pipeline_id, None)
+        self.details.pop(pipeline_id, None)
+        if len(self.heap) > 2 * len(self.entries) + 16:
+            self.heap = [e for e in self.heap if self._is_live(e)]
+            self.ages = [e for e in self.ages if self._is_live(e)]
+            self.latest_starts = [e for e in self.latest_starts if self._is_live(e)]
+            heapq.heapify(self.heap)
+            heapq.heapify(self.ages)
+            heapq.heapify(self.latest_starts)
+
+
+    def clear(self) -> None:
+        """
+        Remove all pipelines from the queue.
+        """
+        self.heap.clear()
+        self.ages.clear()
+        self.latest_starts.clear()
+        self.entries.clear()
+        self.details.clear()
+
+
+    def starving(self, now: Optional[float] = None) -> List[str]:
+        """
+        Get the pipelines waiting for longer than MAX_WAIT seconds, oldest first.
+        """
+        if self.max_wait <= 0:
+            return []
+        now = time.time() if now is None else now
+        while self.ages and not self._is_live(self.ages[0]):
+            heapq.heappop(self.ages)
+
+        popped = []
+        while self.ages and now - self.ages[0][0] > self.max_wait:
+            popped.append(heapq.heappop(self.ages))
+        for entry in popped:
+            heapq.heappush(self.ages, entry)
+        return [entry[2] for entry in popped if self._is_live(entry)]
+
+
+    def ordered(self, now: Optional[float] = None) -> List[str]:
+        """
+        Get the pipelines in the order they should be triggered: starving pipelines first,
+        then by rank.
+        """
+        return list(self.iter_ordered(now))
+
+
+    def iter_ordered(self, now: Optional[float] = None) -> Iterator[str]:
+        """
+        Iterate lazily over the pipelines in the order they should be triggered, popping them
+        from a copy of the heap, so a consumer that stops early only pays for the pipelines it takes.
+        Pipelines removed from the queue while iterating are skipped.
+        """
+        now = time.time() if now is None else now
+        self._drop_missed_deadlines(now)
+        starving = self.starving(now)
+        skip = set(starving)
+        heap = list(self.heap)
+        for pipeline_id in starving:
+            if pipeline_id in self.entries:
+                yield pipeline_id
+        while heap:
+            entry = heapq.heappop(heap)
+            if self._is_live(entry) and entry[2] not in skip:
+                yield entry[2]
+
+
+    def _drop_missed_deadlines(self, now: float) -> None:
+        """
+        Rank again, without their deadline, the pipelines that can no longer meet it.
+        """
+        while self.latest_starts and self.latest_starts[0][0] < now:
+            entry = heapq.heappop(self.latest_starts)
+            if self._is_live(entry):
+                pipeline_id = entry[2]
+                self.push(pipeline_id, *self.details[pipeline_id])
+
+
+    def _is_live(self, entry: Tuple) -> bool:
+        """
+        Check if a heap entry is the current entry of a pipeline in the queue.
+        """
+        return self.entries.get(entry[2]) == entry[1]
+
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_ordered()
+
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+    def __contains__(self, pipeline_id: str) -> bool:
+        return pipeline_id in self.entries
@@ -1,14 +1,24 @@
 import uuid
-from typing import List
+from pathlib import Path
+from typing import List, Optional
 from fastapi import FastAPI, UploadFile, Form, File
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from server.components import PipelineManager, DecisionUnit, NodeManager, DataManager
+from server.components import (
+    PipelineManager,
+    DecisionUnit,
+    NodeManager,
+    DataManager,
+    TemplateCache,
+    BlobStore,
+    ArtifactCache
+)
 from server.settings import (
     WAIT_INTERVAL,
     UPDATE_INTERVAL,
+    DATASETS_SCAN_INTERVAL,
     METADATA_FILENAME,
     PIPELINE_FILENAME,
     pipelines_dir
@@ -18,7 +28,10 @@ from server.settings import (
 node_manager = NodeManager()
 data_manager = DataManager()
 decision_unit = DecisionUnit(node_manager, data_manager)
-pipeline_manager = PipelineManager(decision_unit, node_manager)
+template_cache = TemplateCache()
+blob_store = BlobStore()
+artifact_cache = ArtifactCache()
+pipeline_manager = PipelineManager(decision_unit, node_manager, template_cache, artifact_cache)
 scheduler = BackgroundScheduler()
 
 @asynccontextmanager
@@ -33,6 +46,11 @@ async def lifespan(app: FastAPI):
         trigger="interval",
         seconds=UPDATE_INTERVAL,
     )
+    scheduler.add_job(
+        func=data_manager.update_datasets,
+        trigger="interval",
+        seconds=DATASETS_SCAN_INTERVAL,
+    )
     scheduler.start()
     yield
     scheduler.shutdown()
@@ -70,28 +88,111 @@ def get_pipeline(pipeline_id: str):
     }
 
 
+@app.get("/metrics/")
+def get_metrics():
+    return {
+        "status": "success",
+        "data": pipeline_manager.get_metrics()
+    }
+
+
+@app.get("/nodes/")
+def get_nodes():
+    return {
+        "status": "success",
+        "data": [
+            {
+                "name": name,
+                "worker_type": node["worker_type"],
+                "draining": name in node_manager.draining,
+                "pipeline": node_manager.occupation.get(name)
+            }
+            for name, node in node_manager.nodes.items()
+        ]
+    }
+
+
+@app.post("/nodes/{node}/drain/")
+def drain_node(node: str):
+    if not node_manager.drain_node(node):
+        return {"status": "error", "message": "Node could not be drained"}
+    return {"status": "success", "message": f"Node {node} draining"}
+
+
+@app.post("/nodes/{node}/uncordon/")
+def uncordon_node(node: str):
+    if not node_manager.uncordon_node(node):
+        return {"status": "error", "message": "Node could not be uncordoned"}
+    return {"status": "success", "message": f"Node {node} schedulable"}
+
+
+@app.get("/nodes/{node}/handover/{pipeline_id}")
+def get_handover(node: str, pipeline_id: str):
+    if node_manager.occupation.get(node) != pipeline_id:
+        return {"status": "error", "message": f"Node {node} not handed over yet"}
+    return {"status": "success", "message": f"Node {node} handed over to pipeline {pipeline_id}"}
+
+
+@app.post("/blobs/")
+def negotiate_blobs(digests: List[str] = Form(...)):
+    return {
+        "status": "success",
+        "missing": blob_store.missing(digests)
+    }
+
+
 @app.post("/submit/")
 async def submit_pipeline(
     name: str = Form(...),
-    components: List[UploadFile] = File(...),
+    components: Optional[List[UploadFile]] = File(None),
+    component_refs: Optional[List[str]] = Form(None),
+    priority: Optional[int] = Form(None),
+    deadline: Optional[float] = Form(None),
+    tenant: Optional[str] = Form(None),
     pipeline: UploadFile = File(...),
     metadata: UploadFile = File(...)
 ):
-    # pipeline_id = str(uuid.uuid3())
-    pipeline_id = "2864981c-2bdd-47e5-863e-4a185c6e2dcc"
+    # Store uploaded component files in the blob store
+    uploaded = {}
+    for file in components or []:
+        content = await file.read()
+        uploaded[file.filename] = blob_store.put(content)
+
+    # Components are referenced by "<filename>:<digest>", in pipeline order
+    if component_refs:
+        refs = [tuple(ref.split(":")) for ref in component_refs]
+    else:
+        refs = list(uploaded.items())
+
+    invalid = [
+        ":".join(ref) for ref in refs
+        if len(ref) != 2 or ref[0] in ("", ".", "..") or ref[0] != Path(ref[0]).name
+    ]
+    if invalid:
+        return {
+            "status": "error",
+            "message": "Invalid component references",
+            "invalid": invalid
+        }
+
+    missing = [digest for _, digest in refs if not blob_store.has(digest)]
+    if missing:
+        return {
+            "status": "error",
+            "message": "Component files missing on the server",
+            "missing": missing
+        }
+
+    pipeline_id = str(uuid.uuid4())
     path = pipelines_dir / pipeline_id
     path.mkdir(parents=True, exist_ok=True)
     
-    # Save component files
+    # Link component files
     components_info = []
-    for file in components:
-        filename = file.filename
+    for filename, digest in refs:
         component_name = filename.split(".")[0].lower().replace("_", "-")
         components_info.append((filename, component_name))
-
-        content = await file.read()
-        with open(path / filename, "wb") as f:
-            f.write(content)
+        blob_store.link(digest, path / filename)
 
     # Save pipeline file
     with open(path / PIPELINE_FILENAME, "wb") as f:
@@ -104,7 +205,7 @@ async def submit_pipeline(
         f.write(content)
 
     # Register pipeline
-    pipeline_manager.add_pipeline(pipeline_id, name, components_info)
+    pipeline_manager.add_pipeline(pipeline_id, name, components_info, priority, deadline, tenant)
 
     response = {
         "status": "success",
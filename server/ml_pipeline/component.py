@@ -8,6 +8,9 @@ class Component:
         self.node = None
         self.platform = None
         self.effort = None
+        self.cache_key = None
+        self.cached = False
+        self.candidates = []
         self.start_time = None
         self.end_time = None
         self.duration = None
@@ -19,5 +22,7 @@ class Component:
         """
         obj_dict = self.__dict__.copy()
         obj_dict.pop("effort", None)
+        obj_dict.pop("cache_key", None)
+        obj_dict.pop("candidates", None)
         obj_dict.pop("filename", None)
         return obj_dict
\ No newline at end of file
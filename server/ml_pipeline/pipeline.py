@@ -23,6 +23,13 @@ class Pipeline:
         self.last_update = None
         self.duration = None
         self.time_window = None
+        self.template_key = None
+        self.priority = 0
+        self.deadline = None
+        self.tenant = None
+        self.preemptions = 0
+        self.speculative_run = None     # speculative copy of a straggling component, if any
+        self.speculations = 0
         self._load_metadata()
 
 
@@ -47,6 +54,8 @@ class Pipeline:
         obj_dict.pop("effort", None)
         obj_dict.pop("last_update", None)
         obj_dict.pop("time_window", None)
+        obj_dict.pop("template_key", None)
+        obj_dict.pop("speculative_run", None)
         obj_dict.pop("metadata", None)
         obj_dict.pop("components", None)
         obj_dict["components"] = {name: component.dict_repr() for name, component in self.components.items()}
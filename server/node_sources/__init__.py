@@ -0,0 +1,3 @@
+from .interface import NodeSourceInterface
+from .kube_source import KubeNodeSource
+from .file_source import FileNodeSource
\ No newline at end of file
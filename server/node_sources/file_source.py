@@ -0,0 +1,105 @@
+import time
+import json
+import bisect
+import yaml
+from pathlib import Path
+from typing import List, Dict, Set, Union
+
+from server.node_sources import NodeSourceInterface
+from server.settings import NODES_FILE, NETWORK_BANDWIDTH, DATASET_CACHE_SIZE
+
+
+class FileNodeSource(NodeSourceInterface):
+
+    def __init__(self, path: str = NODES_FILE):
+        if path is None:
+            raise ValueError("NODES_FILE must be set to use the file node source")
+        self.path = Path(path)
+        self.started_at = time.time()
+        self.cordons: Dict[str, bool] = {}      # unschedulable flags set at runtime
+        self.pulled: Dict[str, Set[str]] = {}   # images pulled at runtime, per node
+
+
+    def list_nodes(self) -> List[Dict]:
+        """
+        Read the nodes from the cluster spec file (YAML or JSON), again at every call so that
+        editing it simulates nodes joining, leaving or draining.
+        """
+        with open(self.path, "r") as f:
+            spec = json.load(f) if self.path.suffix == ".json" else yaml.safe_load(f)
+        if isinstance(spec, dict):
+            spec = spec.get("nodes", [])
+
+        nodes = []
+        for node in spec or []:
+            if not node.get("ready", True):
+                continue
+            name = node["name"]
+            images = node.get("images", {})
+            if isinstance(images, list):
+                images = {image: 0 for image in images}
+            images.update({image: 0 for image in self.pulled.get(name, ()) if image not in images})
+            nodes.append({
+                "name": name,
+                "worker_type": node.get("worker_type"),
+                "ip": node.get("ip", "127.0.0.1"),
+                "os": node.get("os", "linux"),
+                "os_image": node.get("os_image", ""),
+                "kernel_version": node.get("kernel_version", ""),
+                "architecture": node.get("architecture", "amd64"),
+                "cpu_cores": int(node.get("cpu_cores", 1)),
+                "n_cpu_flags": int(node.get("n_cpu_flags", 0)),
+                "memory": int(node["memory"]) * 1024,
+                "memory_usage": self._get_memory_usage(node.get("memory_usage", 0.0)),
+                "accelerator": node.get("accelerator", "none"),
+                "bandwidth": int(node.get("network_bandwidth", NETWORK_BANDWIDTH)),
+                "cache_size": int(node.get("dataset_cache_size", DATASET_CACHE_SIZE)) * 1024,
+                "images": images,
+                "draining": self.cordons.get(name, bool(node.get("draining", False)))
+            })
+        return nodes
+
+
+    def set_unschedulable(self, node: str, unschedulable: bool) -> None:
+        """
+        Cordon or uncordon a node, overriding the cluster spec file.
+        """
+        self.cordons[node] = unschedulable
+
+
+    def create_prepull(self, node: str, image: str, name: str) -> None:
+        """
+        Pull an image on a node, instantly.
+        """
+        self.pulled.setdefault(node, set()).add(image)
+
+
+    def delete_prepull(self, name: str) -> None:
+        """
+        Nothing to delete, images are pulled instantly.
+        """
+        pass
+
+
+    def _get_memory_usage(self, usage: Union[float, List]) -> float:
+        """
+        Get the memory usage of a node, either constant or following a synthetic usage curve:
+        [seconds, usage] points since the source was created, linearly interpolated and
+        repeated after the last point.
+        """
+        if not isinstance(usage, list):
+            return float(usage)
+
+        times = [float(t) for t, _ in usage]
+        values = [float(v) for _, v in usage]
+        elapsed = time.time() - self.started_at
+        if times[-1] > 0:
+            elapsed %= times[-1]
+
+        i = bisect.bisect_right(times, elapsed)
+        if i == 0:
+            return round(values[0], 2)
+        if i == len(times):
+            return round(values[-1], 2)
+        ratio = (elapsed - times[i - 1]) / (times[i] - times[i - 1])
+        return round(values[i - 1] + ratio * (values[i] - values[i - 1]), 2)
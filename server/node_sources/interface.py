@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict
+
+
+class NodeSourceInterface(ABC):
+    """Abstract base class for the sources of the cluster nodes."""
+
+    @abstractmethod
+    def list_nodes(self) -> List[Dict]:
+        """List the ready worker nodes with their details, metrics and draining state."""
+        pass
+
+    @abstractmethod
+    def set_unschedulable(self, node: str, unschedulable: bool) -> None:
+        """Set the unschedulable (cordon) flag of a node."""
+        pass
+
+    @abstractmethod
+    def create_prepull(self, node: str, image: str, name: str) -> None:
+        """Start pulling an image on a node, as the named pre-pull task."""
+        pass
+
+    @abstractmethod
+    def delete_prepull(self, name: str) -> None:
+        """Delete the named pre-pull task."""
+        pass
@@ -0,0 +1,179 @@
+import requests
+from typing import List, Dict
+from kubernetes import config, client
+
+from server.node_sources import NodeSourceInterface
+from server.settings import (
+    DEBUG,
+    KUBE_CONFIG,
+    PROMETHEUS_URL,
+    NODE_EXPORTER_PORT,
+    KUBE_APISERVER_PORT,
+    NETWORK_BANDWIDTH,
+    DATASET_CACHE_SIZE,
+    PREPULL_NAMESPACE
+)
+
+
+class KubeNodeSource(NodeSourceInterface):
+
+    def __init__(self):
+        self._load_kube_config()
+        self.kube_client = client.CoreV1Api()
+
+
+    def _load_kube_config(self) -> None:
+        """
+        Load Kubernetes configuration depending on DEBUG flag.
+        """
+        if DEBUG:
+            config.load_kube_config(config_file=KUBE_CONFIG)
+        else:
+            config.load_incluster_config()
+
+
+    def list_nodes(self) -> List[Dict]:
+        """
+        Fetch metadata and metrics for all agent worker nodes that are ready.
+        Cordoned nodes are draining.
+        """
+        nodes_response = self.kube_client.list_node()
+
+        nodes = []
+        for node in nodes_response.items:
+            annotations = node.metadata.annotations.get("k3s.io/node-args", "")
+            conditions = node.status.conditions
+            if "agent" not in annotations or not self._is_node_ready(conditions):
+                continue
+
+            node_ip = node.status.addresses[0].address
+            labels = node.metadata.labels
+            info = node.status.node_info
+            memory = int(node.status.allocatable["memory"][:-2])
+            nodes.append({
+                "name": node.metadata.name,
+                "worker_type": labels.get("worker_type"),
+                "ip": node_ip,
+                "os": info.operating_system,
+                "os_image": info.os_image,
+                "kernel_version": info.kernel_version,
+                "architecture": info.architecture,
+                "cpu_cores": int(node.status.allocatable["cpu"]),
+                "n_cpu_flags": int(labels.get("n_cpu_flags", 0)),
+                "memory": memory,
+                "memory_usage": self._get_memory_usage(node_ip, memory),
+                "accelerator": labels.get("accelerator_type"),
+                "bandwidth": int(labels.get("network_bandwidth", NETWORK_BANDWIDTH)),
+                "cache_size": int(labels.get("dataset_cache_size", DATASET_CACHE_SIZE)) * 1024,
+                "images": self._get_images(node.status.images),
+                "draining": bool(node.spec.unschedulable)
+            })
+        return nodes
+
+
+    def set_unschedulable(self, node: str, unschedulable: bool) -> None:
+        """
+        Cordon or uncordon a node.
+        """
+        self.kube_client.patch_node(node, {"spec": {"unschedulable": unschedulable}})
+
+
+    def create_prepull(self, node: str, image: str, name: str) -> None:
+        """
+        Pull an image on a node with a pod that exits immediately.
+        """
+        pod = client.V1Pod(
+            metadata=client.V1ObjectMeta(name=name, labels={"app": "prepull"}),
+            spec=client.V1PodSpec(
+                node_selector={"kubernetes.io/hostname": node},
+                restart_policy="Never",
+                containers=[
+                    client.V1Container(
+                        name="prepull",
+                        image=image,
+                        image_pull_policy="IfNotPresent",
+                        command=["sh", "-c", "true"]
+                    )
+                ]
+            )
+        )
+        self.kube_client.create_namespaced_pod(namespace=PREPULL_NAMESPACE, body=pod)
+
+
+    def delete_prepull(self, name: str) -> None:
+        """
+        Delete a pre-pull pod.
+        """
+        self.kube_client.delete_namespaced_pod(name=name, namespace=PREPULL_NAMESPACE)
+
+
+    def _get_images(self, images: List) -> Dict[str, int]:
+        """
+        Map the names (tags and digests) of the images present on a node to their sizes in bytes.
+        """
+        names = {}
+        for image in images or []:
+            for name in image.names or []:
+                names[name] = image.size_bytes or 0
+        return names
+
+
+    def _get_memory_usage(self, node_ip: str, total_memory: int) -> float:
+        """
+        Analyze memory usage on the node.
+        """
+        free_memory_avg = self._get_free_memory_avg(node_ip)
+        kfp_memory_usage_avg = self._get_kfp_memory_usage_avg(node_ip)
+        memory_usage_no_kfp = total_memory - free_memory_avg - kfp_memory_usage_avg
+        memory_usage = memory_usage_no_kfp / total_memory
+        return round(memory_usage, 2)
+    
+
+    def _is_node_ready(self, conditions: List) -> bool:
+        """
+        Check if the node is ready based on its conditions.
+        """
+        for condition in conditions:
+            if condition.type == "Ready":
+                return condition.status == "True"
+        return False
+        
+
+    def _get_prometheus_metric(self, query: str) -> int:
+        """
+        Query Prometheus and return the result value.
+        """
+        response = requests.get(PROMETHEUS_URL, params={"query": query}, timeout=6).json()
+        try:
+            result = response["data"]["result"][0]
+            return int(result["value"][1])
+        except (IndexError, KeyError, ValueError):
+            return 0
+
+
+    def _get_free_memory_avg(self, node_ip: str) -> int:
+        """
+        Calculate average free memory (in KB) for a node (over 5 minutes).
+        """
+        instance = f"{node_ip}:{NODE_EXPORTER_PORT}"
+        query = (
+            f'round('
+            f'avg_over_time(node_memory_MemAvailable_bytes{{instance="{instance}"}}[5m:]) '
+            f'/ 1024)'
+        )   
+        return self._get_prometheus_metric(query)
+
+
+    def _get_kfp_memory_usage_avg(self, node_ip: str) -> int:
+        """
+        Calculate average memory usage (in KB) for KFP containers on a node (over 5 minutes).
+        """
+        instance = f"{node_ip}:{KUBE_APISERVER_PORT}"
+        query = (
+            f'round('
+            f'avg_over_time('
+            f'sum by (instance) (container_memory_usage_bytes{{namespace="kubeflow", instance="{instance}", container!=""}})[5m:]'
+            f') / 1024'
+            f')'
+        )
+        return self._get_prometheus_metric(query)
@@ -3,4 +3,5 @@ from .custom import CustomPlacer
 from .fifo_random import FifoRandomPlacer
 from .fifo_rr import FifoRoundRobinPlacer
 from .fifo_greedy import FifoGreedyPlacer
-from .random_random import RandomRandomPlacer
\ No newline at end of file
+from .random_random import RandomRandomPlacer
+from .vector_packing import VectorPackingPlacer
\ No newline at end of file
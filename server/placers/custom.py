@@ -1,9 +1,11 @@
 import json
-from typing import Dict, List, Tuple, Set
+import time
+from typing import Dict, List, Tuple, Set, Optional
 
 from server.placers import PlacerInterface
 from server.ml_pipeline import Pipeline, Component
-from server.components import NodeManager, DataManager, MLEstimator
+from server.components import NodeManager, DataManager, MLEstimator, WaitingQueue
+from server.settings import LATE_BINDING, LATE_BINDING_CANDIDATES, CORE_GFLOPS, MAX_WAIT
 
 
 class CustomPlacer(PlacerInterface):
@@ -14,6 +16,7 @@ class CustomPlacer(PlacerInterface):
         self.estimator = MLEstimator()
         self.assignments = None          # attr from DecisionUnit
         self.assignments_counts = None   # attr from DecisionUnit
+        self.efforts = None
         self.accelerator_score = 3
 
         with open("server/placers/custom_heuristics.json", "r") as f:
@@ -44,15 +47,12 @@ class CustomPlacer(PlacerInterface):
         self.assignments = assignments
         self.assignments_counts = assignments_counts
 
-        # Scheduling: SJF
+        # Scheduling: priority classes, EDF, then SJF with aging
         efforts = self._calc_pipeline_efforts(pipelines)
-        run_order = sorted(
-            list(efforts.keys()),
-            key=lambda x: efforts[x]["total"]
-        )
+        self.efforts = efforts
+        run_order = self._get_run_order(pipelines, efforts)
 
         # Placement: pipeline-aware heuristic
-        self.node_manager.update_nodes()
         pipelines_dict = {pipeline.id: pipeline for pipeline in pipelines}
         placements = []
         
@@ -60,21 +60,50 @@ class CustomPlacer(PlacerInterface):
             pipeline = pipelines_dict[pipeline_id]
             metadata = pipeline.get_metadata()
             mapping = {}
+            candidates = {}
             for component in pipeline.get_components():
                 strategy_fn = self.node_selectors[component.type]
                 node, platform = strategy_fn(pipeline_id, metadata)
                 mapping[component.name] = (node, platform)
-                self._add_assignment(node, pipeline_id, component.name)
+                self._add_assignment(node, pipeline_id, component, metadata)
+                if LATE_BINDING:
+                    candidates[component.name] = self._rank_candidates(node, pipeline_id, component, metadata)
             
             placements.append({
                 "pipeline_id": pipeline_id,
                 "mapping": mapping,
-                "efforts": efforts[pipeline_id]
+                "efforts": efforts[pipeline_id],
+                "candidates": candidates
             })
         
         return placements
 
 
+    def _get_run_order(self, pipelines: List[Pipeline], efforts: Dict[str, Dict]) -> List[str]:
+        """
+        Order the pipelines by the rank of the waiting queue: priority class, earliest feasible deadline,
+        then shortest job first, aged by their waiting time if enabled. Pipelines waiting for longer
+        than MAX_WAIT go first. Service times are estimated on the fastest node, so that only
+        the deadlines that cannot be met anywhere are ignored.
+        """
+        now = time.time()
+        nodes = [node["name"] for node in self.node_manager.get_nodes()]
+
+        def rank(pipeline: Pipeline) -> Tuple:
+            submitted_at = pipeline.submitted_at.timestamp()
+            if MAX_WAIT > 0 and now - submitted_at > MAX_WAIT:
+                return (False, submitted_at)
+            effort = efforts[pipeline.id]["total"]
+            service = min(
+                (self.node_manager.estimate_duration(node, effort) for node in nodes),
+                default=effort / (CORE_GFLOPS * 1e9)
+            )
+            deadline = pipeline.deadline.timestamp() if pipeline.deadline is not None else None
+            return (True, WaitingQueue.rank(service, submitted_at, pipeline.priority, deadline, now))
+
+        return [pipeline.id for pipeline in sorted(pipelines, key=rank)]
+
+
     def _calc_pipeline_efforts(self, pipelines: List[Pipeline]) -> Dict[str, Dict]:
         """
         Calculate the effort for each pipeline and its components.
@@ -99,6 +128,8 @@ class CustomPlacer(PlacerInterface):
         """
         Calculate the effort for a specific component based on its type.
         """
+        if component.cached:
+            return 0    # artifacts reused from the preprocessing cache
         if component.type in self.effort_calculators:
             return self.effort_calculators[component.type](metadata)
         else:
@@ -174,16 +205,13 @@ class CustomPlacer(PlacerInterface):
         Select a node for preprocessing.
         """
         dataset = metadata["dataset"]
-        size = max(
-            self.data_manager.size_in_memory(dataset, "original"),
-            self.data_manager.size_in_memory(dataset, "preprocessed")
-        )
+        size = self.data_manager.memory_required(dataset, "preprocessing")
 
         # Find nodes that fit the data
         filters = {"worker_type": ["low", "med", "high-cpu"]}
         candidates = self.node_manager.get_nodes(filters=filters, sort_params=["memory"])
-        candidates = [node for node in candidates if self._has_sufficient_memory(size, node)]
-        node = self._least_loaded_node(candidates)
+        candidates = self._filter_by_memory(size, candidates)
+        node = self._fastest_read_node(candidates, pipeline_id, metadata)
         
         return (
             node["name"],
@@ -197,8 +225,7 @@ class CustomPlacer(PlacerInterface):
         """
         # Dataset
         dataset = metadata["dataset"]
-        size = self.data_manager.size_in_memory(dataset, "preprocessed")
-        size = int(size * metadata["dataset"]["train_percentage"])
+        size = self.data_manager.memory_required(dataset, "training")
 
         # Model
         model = metadata["model"]["type"]
@@ -209,10 +236,11 @@ class CustomPlacer(PlacerInterface):
             "architecture": heuristics["architecture"]
         }
         candidates = self.node_manager.get_nodes(filters=filters, sort_params=sorting)
+        pull_times = self._get_pull_times(candidates, metadata, "training")
 
         if model not in ["nn", "cnn"]:
-            candidates = [node for node in candidates if self._has_sufficient_memory(size, node)]
-            node = self._select_best_node(candidates, pipeline_id)
+            candidates = self._filter_by_memory(size, candidates)
+            node = self._select_best_node(candidates, pipeline_id, pull_times)
         else:
             scores = {}
             for node in candidates:
@@ -222,11 +250,12 @@ class CustomPlacer(PlacerInterface):
                 scores[node["name"]] = score
             candidates = sorted(
                 candidates,
-                key=lambda x: (scores[x["name"]], -self.assignments_counts[x["name"]]),
+                key=lambda x: (scores[x["name"]], -self.assignments_counts[x["name"]], -pull_times[x["name"]]),
                 reverse=True
             )
             node = candidates[0]
 
+        node = self._apply_data_locality(node, candidates, pipeline_id, metadata, "training")
         return (
             node["name"],
             self.node_manager.get_node_platform(node["name"])
@@ -239,8 +268,7 @@ class CustomPlacer(PlacerInterface):
         """
         # Dataset
         dataset = metadata["dataset"]
-        size = self.data_manager.size_in_memory(dataset, "preprocessed")
-        size = int(size * metadata["dataset"]["test_percentage"])
+        size = self.data_manager.memory_required(dataset, "evaluation")
 
         # Model
         model = metadata["model"]["type"]
@@ -251,8 +279,10 @@ class CustomPlacer(PlacerInterface):
             "architecture": heuristics["architecture"]
         }
         candidates = self.node_manager.get_nodes(filters=filters, sort_params=sorting)
-        candidates = [node for node in candidates if self._has_sufficient_memory(size, node)]
-        node = self._select_best_node(candidates, pipeline_id)
+        candidates = self._filter_by_memory(size, candidates)
+        pull_times = self._get_pull_times(candidates, metadata, "evaluation")
+        node = self._select_best_node(candidates, pipeline_id, pull_times)
+        node = self._apply_data_locality(node, candidates, pipeline_id, metadata, "evaluation")
 
         return (
             node["name"],
@@ -260,26 +290,187 @@ class CustomPlacer(PlacerInterface):
         )
 
 
-    def _has_sufficient_memory(self, size: int, node: Dict) -> bool:
+    def _rank_candidates(
+        self,
+        node: str,
+        pipeline_id: str,
+        component: Component,
+        metadata: Dict
+    ) -> List[Tuple[str, str]]:
+        """
+        Rank the nodes a component can be bound to when its pipeline is triggered: the selected node first,
+        then the nodes eligible under the same heuristics that fit its memory, expected to finish first.
+        """
+        filters = self.get_node_filters(component.type, metadata)
+        size = 0 if component.cached else self.data_manager.memory_required(metadata["dataset"], component.type)
+        candidates = [
+            c for c in self.node_manager.get_nodes(filters=filters)
+            if c["name"] != node and self._has_sufficient_memory(size, c, reserved=False)
+        ]
+
+        effort = self.efforts[pipeline_id][component.name]
+        pull_times = self._get_pull_times(candidates, metadata, component.type)
+
+        size = 0 if component.type == "preprocessing" else self._get_artifact_size(metadata, component.type)
+
+        def expected_time(c: Dict) -> float:
+            duration = self.node_manager.estimate_duration(c["name"], effort) + pull_times[c["name"]]
+            if component.type == "preprocessing":
+                duration += self.data_manager.read_time(c["name"], metadata["dataset"])
+            else:
+                duration += self.node_manager.object_store_time(c["name"], size)
+            return duration
+
+        ranked = [node] + [c["name"] for c in sorted(candidates, key=expected_time)]
+        return [(name, self.node_manager.get_node_platform(name)) for name in ranked[:LATE_BINDING_CANDIDATES]]
+
+
+    def get_node_filters(self, component_type: str, metadata: Dict) -> Dict:
+        """
+        Get the filters of the nodes eligible for a stage under the custom heuristics.
+        """
+        if component_type == "preprocessing":
+            return {"worker_type": ["low", "med", "high-cpu"]}
+        heuristics = self.heuristics[component_type][metadata["model"]["type"]]
+        return {
+            "worker_type": heuristics["worker_type"],
+            "architecture": heuristics["architecture"]
+        }
+
+
+    def _has_sufficient_memory(self, size: int, node: Dict, reserved: bool = True) -> bool:
+        """
+        Check if the node has sufficient free memory for the memory required by a stage,
+        accounting for the memory reserved by components placed but not finished.
+        """
+        return self.node_manager.get_free_memory(node["name"], reserved) > size
+
+
+    def _filter_by_memory(self, size: int, candidates: List[Dict]) -> List[Dict]:
+        """
+        Keep the candidates with sufficient memory for a stage. Reservations are ignored
+        when no candidate can take them, since the stage will wait for memory anyway.
+        """
+        nodes = [node for node in candidates if self._has_sufficient_memory(size, node)]
+        if not nodes:
+            nodes = [node for node in candidates if self._has_sufficient_memory(size, node, reserved=False)]
+        return nodes
+
+
+    def _fastest_read_node(self, candidates: List[Dict], pipeline_id: str, metadata: Dict) -> Dict:
+        """
+        Select the preprocessing node that is expected to finish first, reading the dataset
+        from its local cache if warm or over NFS otherwise, after its current assignments
+        and the pull of its image.
+        """
+        components = {t: c for c, t in metadata["components_type"].items()}
+        effort = self.efforts[pipeline_id][components["preprocessing"]]
+        dataset = metadata["dataset"]
+        pull_times = self._get_pull_times(candidates, metadata, "preprocessing")
+
+        def expected_time(node: Dict) -> float:
+            duration = self.node_manager.estimate_duration(node["name"], effort)
+            duration += self.data_manager.read_time(node["name"], dataset)
+            return duration * (1 + self.assignments_counts[node["name"]]) + pull_times[node["name"]]
+
+        return min(candidates, key=expected_time)
+
+
+    def _apply_data_locality(
+        self,
+        node: Dict,
+        candidates: List[Dict],
+        pipeline_id: str,
+        metadata: Dict,
+        component_type: str
+    ) -> Dict:
+        """
+        Move a stage to the node that produced its input artifacts when it finishes sooner there,
+        after the current assignments of each node. KFP artifacts always go through the object store,
+        so running on the producer does not avoid the transfer: the upload is the same for both nodes,
+        and each node downloads the artifacts over its own link to the store, on top of its compute
+        (and image pull) time.
+        """
+        components = {t: c for c, t in metadata["components_type"].items()}
+        if "preprocessing" not in components:
+            return node
+        producer = self._get_component_node(pipeline_id, components["preprocessing"])
+        if producer is None or producer == node["name"]:
+            return node
+        if self.efforts[pipeline_id][components["preprocessing"]] == 0:
+            return node     # artifacts reused from the preprocessing cache, not held by a node
+
+        producer_node = next((c for c in candidates if c["name"] == producer), None)
+        if producer_node is None:
+            return node
+
+        size = self._get_artifact_size(metadata, component_type)
+        effort = self.efforts[pipeline_id][components[component_type]]
+        pull_times = self._get_pull_times([producer_node, node], metadata, component_type)
+
+        def expected_time(name: str) -> float:
+            duration = self.node_manager.estimate_duration(name, effort)
+            duration += self.node_manager.transfer_time(producer, name, size)
+            return duration * (1 + self.assignments_counts[name]) + pull_times[name]
+
+        return producer_node if expected_time(producer) < expected_time(node["name"]) else node
+
+
+    def _get_artifact_size(self, metadata: Dict, component_type: str) -> int:
+        """
+        Get the size (in kilobytes) of the preprocessed artifacts read by a training or evaluation stage.
+        """
+        dataset = metadata["dataset"]
+        percentage = dataset["train_percentage" if component_type == "training" else "test_percentage"]
+        return int(self.data_manager.size_in_memory(dataset, "preprocessed") * percentage)
+
+
+    def _get_pull_times(self, candidates: List[Dict], metadata: Dict, component_type: str) -> Dict[str, float]:
+        """
+        Estimate the time each candidate takes to pull the image of a stage, zero if warm.
+        """
+        components = {t: c for c, t in metadata["components_type"].items()}
+        image = metadata.get("components_image", {}).get(components.get(component_type))
+        pull_times = {}
+        for node in candidates:
+            if image is None:
+                pull_times[node["name"]] = 0.0
+                continue
+            platform = self.node_manager.get_node_platform(node["name"])
+            pull_times[node["name"]] = self.node_manager.pull_time(node["name"], f"{image}:{platform}")
+        return pull_times
+
+
+    def _get_component_node(self, pipeline_id: str, component: str) -> Optional[str]:
         """
-        Check if the node has sufficient memory for the data plus overhead.
+        Get the node a component of the pipeline is assigned to, if any.
         """
-        memory = node["memory"]
-        memory_usage = node["memory_usage"]
-        memory_free = memory - (memory * memory_usage)
-        memory_required = size * 2
-        return memory_free > memory_required
+        component_id = f"{pipeline_id}/{component}"
+        for node, components in self.assignments.items():
+            if component_id in components:
+                return node
+        return None
 
 
-    def _least_loaded_node(self, nodes: List[Dict]) -> Dict:
+    def _least_loaded_node(self, nodes: List[Dict], pull_times: Optional[Dict[str, float]] = None) -> Dict:
         """
-        Select the least loaded node based on the number of assignments.
+        Select the least loaded node based on the number of assignments,
+        preferring nodes with the image already pulled among equally loaded ones.
         """
-        overload = sorted(nodes, key=lambda x: self.assignments_counts[x["name"]])
+        pull_times = pull_times or {}
+        overload = sorted(
+            nodes,
+            key=lambda x: (self.assignments_counts[x["name"]], pull_times.get(x["name"], 0.0))
+        )
         return overload[0]
     
 
-    def _select_best_node(self, candidates: List[Dict], pipeline_id: str) -> Dict:
+    def _select_best_node(
+        self,
+        candidates: List[Dict],
+        pipeline_id: str,
+        pull_times: Optional[Dict[str, float]] = None
+    ) -> Dict:
         """
         Select the best node from the candidates based on the pipeline ID.
         """
@@ -295,7 +486,7 @@ class CustomPlacer(PlacerInterface):
 
         common_nodes = [c for c in candidates if c["name"] in nodes]
         candidates = common_nodes if common_nodes else candidates
-        return self._least_loaded_node(candidates)
+        return self._least_loaded_node(candidates, pull_times)
         
 
     def _fallback_node(self) -> Dict:
@@ -306,9 +497,13 @@ class CustomPlacer(PlacerInterface):
         return self._least_loaded_node(nodes)
 
 
-    def _add_assignment(self, node: str, pipeline_id: str, component: str):
+    def _add_assignment(self, node: str, pipeline_id: str, component: Component, metadata: Dict):
         """
-        Add an assignment to the node.
+        Add an assignment to the node and reserve the memory required by the component.
         """
-        self.assignments[node].add(f"{pipeline_id}/{component}")
+        component_id = f"{pipeline_id}/{component.name}"
+        self.assignments[node].add(component_id)
         self.assignments_counts[node] += 1
+        if not component.cached:
+            size = self.data_manager.memory_required(metadata["dataset"], component.type)
+            self.node_manager.reserve_memory(node, component_id, size)
@@ -13,13 +13,14 @@ class FifoRoundRobinPlacer(PlacerInterface):
         self.data_manager = data_manager
         self.assignments = None          # attr from DecisionUnit
         self.assignments_counts = None   # attr from DecisionUnit
+        self.node_names = []
         self.nodes_iter = None
         self._initialize_cycle()
 
     
     def _initialize_cycle(self):
-        node_names = [n.get("name") for n in self.node_manager.get_nodes()]
-        self.nodes_iter = cycle(node_names)
+        self.node_names = [n.get("name") for n in self.node_manager.get_nodes()]
+        self.nodes_iter = cycle(self.node_names)
 
 
     def place_pipelines(
@@ -33,8 +34,9 @@ class FifoRoundRobinPlacer(PlacerInterface):
         """
         self.assignments = assignments
         self.assignments_counts = assignments_counts
+        if self.node_names != [n.get("name") for n in self.node_manager.get_nodes()]:
+            self._initialize_cycle()    # nodes joined, left or are draining
 
-        self.node_manager.update_nodes()
         placements = []
         for pipeline in pipelines:
             metadata = pipeline.get_metadata()
@@ -42,7 +44,7 @@ class FifoRoundRobinPlacer(PlacerInterface):
             for component in pipeline.get_components():
                 node, platform = self._get_node(component, metadata)
                 mapping[component.name] = (node, platform)
-                self._add_assignment(node, pipeline.id, component.name)
+                self._add_assignment(node, pipeline.id, component, metadata)
 
             placements.append({
                 "pipeline_id": pipeline.id,
@@ -57,14 +59,13 @@ class FifoRoundRobinPlacer(PlacerInterface):
         Select a node to place the component according to the strategy.
         """
         dataset = metadata["dataset"]
-        size = max(
-            self.data_manager.size_in_memory(dataset, "original"),
-            self.data_manager.size_in_memory(dataset, "preprocessed")
-        )
+        size = self.data_manager.memory_required(dataset, component.type)
 
+        nodes = self.node_manager.get_nodes()
+        reserved = any(self._has_sufficient_memory(size, n) for n in nodes)  # else ignore reservations
         next_node_name = next(self.nodes_iter)
         next_node = self.node_manager.get_node_by_name(next_node_name)
-        while not self._has_sufficient_memory(size, next_node):
+        while not self._has_sufficient_memory(size, next_node, reserved):
             next_node_name = next(self.nodes_iter)
             next_node = self.node_manager.get_node_by_name(next_node_name)
 
@@ -73,20 +74,21 @@ class FifoRoundRobinPlacer(PlacerInterface):
         return node_name, node_platform
 
 
-    def _has_sufficient_memory(self, size: int, node: Dict) -> bool:
+    def _has_sufficient_memory(self, size: int, node: Dict, reserved: bool = True) -> bool:
         """
-        Check if the node has sufficient memory for the data plus overhead.
+        Check if the node has sufficient free memory for the memory required by a stage,
+        accounting for the memory reserved by components placed but not finished.
         """
-        memory = node["memory"]
-        memory_usage = node["memory_usage"]
-        memory_free = memory - (memory * memory_usage)
-        memory_required = size * 2
-        return memory_free > memory_required
+        return self.node_manager.get_free_memory(node["name"], reserved) > size
     
 
-    def _add_assignment(self, node: str, pipeline_id: str, component: str):
+    def _add_assignment(self, node: str, pipeline_id: str, component: Component, metadata: Dict):
         """
-        Add an assignment to the node.
+        Add an assignment to the node and reserve the memory required by the component.
         """
-        self.assignments[node].add(f"{pipeline_id}/{component}")
+        component_id = f"{pipeline_id}/{component.name}"
+        self.assignments[node].add(component_id)
         self.assignments_counts[node] += 1
+        if not component.cached:
+            size = self.data_manager.memory_required(metadata["dataset"], component.type)
+            self.node_manager.reserve_memory(node, component_id, size)
@@ -30,7 +30,6 @@ class RandomRandomPlacer(PlacerInterface):
         
         self.assignments = assignments
         self.assignments_counts = assignments_counts
-        self.node_manager.update_nodes()
 
         # Random execution order
         random.shuffle(pipelines)
@@ -42,7 +41,7 @@ class RandomRandomPlacer(PlacerInterface):
             for component in pipeline.get_components():
                 node, platform = self._get_random_node(component, metadata)
                 mapping[component.name] = (node, platform)
-                self._add_assignment(node, pipeline.id, component.name)
+                self._add_assignment(node, pipeline.id, component, metadata)
 
             placements.append({
                 "pipeline_id": pipeline.id,
@@ -57,14 +56,12 @@ class RandomRandomPlacer(PlacerInterface):
         Select a node to place the component according to the strategy.
         """
         dataset = metadata["dataset"]
-        size = max(
-            self.data_manager.size_in_memory(dataset, "original"),
-            self.data_manager.size_in_memory(dataset, "preprocessed")
-        )
+        size = self.data_manager.memory_required(dataset, component.type)
 
         nodes = self.node_manager.get_nodes()
+        reserved = any(self._has_sufficient_memory(size, n) for n in nodes)  # else ignore reservations
         random_node = random.choice(nodes)
-        while not self._has_sufficient_memory(size, random_node):
+        while not self._has_sufficient_memory(size, random_node, reserved):
             random_node = random.choice(nodes)
 
         node_name = random_node["name"]
@@ -72,20 +69,21 @@ class RandomRandomPlacer(PlacerInterface):
         return node_name, node_platform
 
 
-    def _has_sufficient_memory(self, size: int, node: Dict) -> bool:
+    def _has_sufficient_memory(self, size: int, node: Dict, reserved: bool = True) -> bool:
         """
-        Check if the node has sufficient memory for the data plus overhead.
+        Check if the node has sufficient free memory for the memory required by a stage,
+        accounting for the memory reserved by components placed but not finished.
         """
-        memory = node["memory"]
-        memory_usage = node["memory_usage"]
-        memory_free = memory - (memory * memory_usage)
-        memory_required = size * 2
-        return memory_free > memory_required
+        return self.node_manager.get_free_memory(node["name"], reserved) > size
     
 
-    def _add_assignment(self, node: str, pipeline_id: str, component: str):
+    def _add_assignment(self, node: str, pipeline_id: str, component: Component, metadata: Dict):
         """
-        Add an assignment to the node.
+        Add an assignment to the node and reserve the memory required by the component.
         """
-        self.assignments[node].add(f"{pipeline_id}/{component}")
+        component_id = f"{pipeline_id}/{component.name}"
+        self.assignments[node].add(component_id)
         self.assignments_counts[node] += 1
+        if not component.cached:
+            size = self.data_manager.memory_required(metadata["dataset"], component.type)
+            self.node_manager.reserve_memory(node, component_id, size)
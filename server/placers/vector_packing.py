@@ -0,0 +1,199 @@
+from typing import Dict, List, Set, Tuple
+import numpy as np
+
+from server.placers import CustomPlacer
+from server.ml_pipeline import Pipeline, Component
+from server.components import NodeManager, DataManager
+from server.settings import CORE_GFLOPS, ACCELERATOR_SPEEDUP, LATE_BINDING
+
+
+ACCELERATED_MODELS = ["nn", "cnn"]
+
+
+class VectorPackingPlacer(CustomPlacer):
+
+    def __init__(self, node_manager: NodeManager, data_manager: DataManager):
+        super().__init__(node_manager, data_manager)
+        self.durations: Dict[str, float] = {}   # estimated duration of the assigned components
+
+
+    def place_pipelines(
+        self,
+        pipelines: List[Pipeline],
+        assignments: Dict[str, Set[str]],
+        assignments_counts: Dict[str, int]
+    ) -> List[Dict]:
+        """
+        Place pipelines on nodes by multi-resource load balancing (worst-fit decreasing).
+        Each component is a (duration, memory) demand, with durations depending on the cores
+        and accelerator of each node. Components of the whole window are placed largest demands
+        first, on the eligible node with the lowest dominant share after placement.
+        Pipelines are scheduled shortest job first, with aging.
+        """
+        self.assignments = assignments
+        self.assignments_counts = assignments_counts
+
+        efforts = self._calc_pipeline_efforts(pipelines)
+        self.efforts = efforts
+
+        nodes = [node for node in self.node_manager.get_nodes() if node["name"] in assignments]
+        names = [node["name"] for node in nodes]
+        capacity = self._get_capacity(nodes)
+        busy = self._get_busy_times(names)
+
+        # Demand of every component in the window
+        components = []
+        demands = []
+        for pipeline in pipelines:
+            metadata = pipeline.get_metadata()
+            for component in pipeline.get_components():
+                effort = efforts[pipeline.id][component.name]
+                size = 0 if component.cached else self.data_manager.memory_required(
+                    metadata["dataset"], component.type
+                )
+                components.append((pipeline, component))
+                demands.append((effort, size, self._is_accelerated(component, metadata)))
+
+        if not components:
+            return []
+
+        demands = np.array(demands, dtype=float)
+        throughput = np.where(
+            demands[:, 2:3].astype(bool),
+            capacity["flops"] * capacity["speedup"],
+            capacity["flops"]
+        )
+        durations = demands[:, 0:1] / throughput                    # (components, nodes)
+
+        # Largest dominant demand first, each on the least loaded node (worst-fit decreasing)
+        dominant = np.maximum(
+            durations.min(axis=1) / max(durations.min(axis=1).max(), 1e-9),
+            demands[:, 1] / capacity["memory"].max()
+        )
+        order = np.argsort(-dominant, kind="stable")
+
+        masks = {}
+        mapping = {pipeline.id: {} for pipeline in pipelines}
+        for i in order:
+            pipeline, component = components[i]
+            metadata = pipeline.get_metadata()
+            size = demands[i, 1]
+
+            key = self._eligibility_key(component, metadata)
+            if key not in masks:
+                masks[key] = self._get_eligibility(nodes, component, metadata)
+            eligible = masks[key]
+
+            j = self._best_node(durations[i], size, eligible, busy, capacity)
+            node = names[j]
+            busy[j] += durations[i, j]
+            capacity["free"][j] -= size
+
+            component_id = f"{pipeline.id}/{component.name}"
+            self.durations[component_id] = durations[i, j]
+            mapping[pipeline.id][component.name] = (node, self.node_manager.get_node_platform(node))
+            self.assignments[node].add(component_id)
+            self.assignments_counts[node] += 1
+            if not component.cached:
+                self.node_manager.reserve_memory(node, component_id, int(size))
+
+        pipelines_dict = {pipeline.id: pipeline for pipeline in pipelines}
+        run_order = [pipelines_dict[pipeline_id] for pipeline_id in self._get_run_order(pipelines, efforts)]
+        return [
+            {
+                "pipeline_id": pipeline.id,
+                "mapping": {c.name: mapping[pipeline.id][c.name] for c in pipeline.get_components()},
+                "efforts": efforts[pipeline.id],
+                "candidates": {
+                    c.name: self._rank_candidates(mapping[pipeline.id][c.name][0], pipeline.id, c, pipeline.get_metadata())
+                    for c in pipeline.get_components()
+                } if LATE_BINDING else {}
+            }
+            for pipeline in run_order
+        ]
+
+
+    def _get_capacity(self, nodes: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        Build the capacity vectors of the nodes.
+        """
+        return {
+            "flops": np.array([node["cpu_cores"] * CORE_GFLOPS * 1e9 for node in nodes], dtype=float),
+            "speedup": np.array(
+                [ACCELERATOR_SPEEDUP if node["accelerator"] != "none" else 1.0 for node in nodes],
+                dtype=float
+            ),
+            "memory": np.array([node["memory"] for node in nodes], dtype=float),
+            "free": np.array([self.node_manager.get_free_memory(node["name"]) for node in nodes], dtype=float),
+            "unreserved": np.array(
+                [self.node_manager.get_free_memory(node["name"], reserved=False) for node in nodes],
+                dtype=float
+            )
+        }
+
+
+    def _get_busy_times(self, names: List[str]) -> np.ndarray:
+        """
+        Get the estimated time each node is busy with the components still assigned to it.
+        Components of running pipelines count with their predicted remaining time.
+        """
+        assigned = set().union(*self.assignments.values())
+        self.durations = {c: d for c, d in self.durations.items() if c in assigned}
+        busy = np.zeros(len(names), dtype=float)
+        for j, name in enumerate(names):
+            for c in self.assignments[name]:
+                remaining = self.node_manager.get_remaining_time(c)
+                busy[j] += self.durations.get(c, 0.0) if remaining is None else remaining
+        return busy
+
+
+    def _is_accelerated(self, component: Component, metadata: Dict) -> bool:
+        """
+        Check if a component can use an accelerator.
+        """
+        return component.type != "preprocessing" and metadata["model"]["type"] in ACCELERATED_MODELS
+
+
+    def _eligibility_key(self, component: Component, metadata: Dict) -> Tuple[str, str]:
+        """
+        Get the key of the eligibility mask of a component.
+        """
+        if component.type == "preprocessing":
+            return (component.type, "")
+        return (component.type, metadata["model"]["type"])
+
+
+    def _get_eligibility(self, nodes: List[Dict], component: Component, metadata: Dict) -> np.ndarray:
+        """
+        Get the mask of the nodes eligible for a component, following the custom heuristics.
+        """
+        filters = self.get_node_filters(component.type, metadata)
+        mask = np.array([all(node[k] in v for k, v in filters.items()) for node in nodes], dtype=bool)
+        return mask if mask.any() else np.ones(len(nodes), dtype=bool)
+
+
+    def _best_node(
+        self,
+        durations: np.ndarray,
+        size: float,
+        eligible: np.ndarray,
+        busy: np.ndarray,
+        capacity: Dict[str, np.ndarray]
+    ) -> int:
+        """
+        Score all nodes at once and return the index of the best one: the lowest dominant share
+        of finish time and memory after placement, among the eligible nodes that fit the memory.
+        """
+        fits = eligible & (capacity["free"] >= size)
+        if not fits.any():
+            fits = eligible & (capacity["unreserved"] >= size)    # reservations ignored
+        if not fits.any():
+            fits = eligible
+
+        finish = busy + durations
+        horizon = max(finish[fits].max(), 1e-9)
+        memory_share = (capacity["memory"] - capacity["free"] + size) / capacity["memory"]
+        share = np.maximum(finish / horizon, memory_share)
+
+        score = np.where(fits, share + finish / horizon * 1e-3, np.inf)  # ties broken by finish time
+        return int(np.argmin(score))
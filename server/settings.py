@@ -8,28 +8,81 @@ from loguru import logger
 
 load_dotenv()
 
+
+def parse_tenant_values(value: str) -> dict:
+    """
+    Parse per-tenant values given as "tenant:value,...", where "*" is the default for other tenants.
+    """
+    values = {}
+    for item in filter(None, value.split(",")):
+        tenant, number = item.rsplit(":", 1)
+        values[tenant.strip()] = float(number)
+    return values
+
+
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 KUBE_CONFIG = os.getenv("KUBE_CONFIG")
+NODE_SOURCE = os.getenv("NODE_SOURCE", "kubernetes")
+NODES_FILE = os.getenv("NODES_FILE")
 KFP_URL = os.getenv("KFP_URL")
 KFP_API_ENDPOINT = os.getenv("KFP_API_ENDPOINT", "/pipeline/apis/v2beta1")
 PROMETHEUS_URL = os.getenv("PROMETHEUS_URL")
 ENABLE_CACHING = os.getenv("ENABLE_CACHING", "false").lower() == "true"
+PREPROCESSING_CACHE = os.getenv("PREPROCESSING_CACHE", "false").lower() == "true"
 PIPELINES_DIR = os.getenv("PIPELINES_DIR", "./pipelines")
 WAIT_INTERVAL = int(os.getenv("WAIT_INTERVAL", "10"))
 UPDATE_INTERVAL = int(os.getenv("UPDATE_INTERVAL", "5"))
 NODE_EXPORTER_PORT = int(os.getenv("NODE_EXPORTER_PORT", "9100"))
 KUBE_APISERVER_PORT = int(os.getenv("KUBE_APISERVER_PORT", "10250"))
+NETWORK_BANDWIDTH = int(os.getenv("NETWORK_BANDWIDTH", "1000"))
+NFS_BANDWIDTH = int(os.getenv("NFS_BANDWIDTH", "1000"))
+OBJECT_STORE_BANDWIDTH = int(os.getenv("OBJECT_STORE_BANDWIDTH", "1000"))
+LOCAL_DISK_BANDWIDTH = int(os.getenv("LOCAL_DISK_BANDWIDTH", "4000"))
+DATASET_CACHE_SIZE = int(os.getenv("DATASET_CACHE_SIZE", "10240"))
+REGISTRY_BANDWIDTH = int(os.getenv("REGISTRY_BANDWIDTH", "1000"))
+DEFAULT_IMAGE_SIZE = int(os.getenv("DEFAULT_IMAGE_SIZE", "2048"))
+PREPULL_IMAGES = os.getenv("PREPULL_IMAGES", "false").lower() == "true"
+PREPULL_NAMESPACE = os.getenv("PREPULL_NAMESPACE", "kubeflow")
+ROLLING_HORIZON = os.getenv("ROLLING_HORIZON", "false").lower() == "true"
+LATE_BINDING = os.getenv("LATE_BINDING", "false").lower() == "true"
+LATE_BINDING_CANDIDATES = int(os.getenv("LATE_BINDING_CANDIDATES", "3"))
+AGING_TIME = float(os.getenv("AGING_TIME", "0"))
+MAX_WAIT = float(os.getenv("MAX_WAIT", "0"))
+PREEMPTION = os.getenv("PREEMPTION", "false").lower() == "true"
+STAGE_PIPELINING = os.getenv("STAGE_PIPELINING", "false").lower() == "true"
+STAGE_PIPELINING_SLACK = float(os.getenv("STAGE_PIPELINING_SLACK", "30"))
+STAGE_GATE_IMAGE = os.getenv("STAGE_GATE_IMAGE", "curlimages/curl")
+SERVER_URL = os.getenv("SERVER_URL")
+SPECULATION = os.getenv("SPECULATION", "false").lower() == "true"
+SPECULATION_THRESHOLD = float(os.getenv("SPECULATION_THRESHOLD", "1.5"))
+SPECULATION_BUDGET = float(os.getenv("SPECULATION_BUDGET", "0.1"))
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_WEIGHTS = parse_tenant_values(os.getenv("TENANT_WEIGHTS", ""))
+TENANT_MAX_NODES = parse_tenant_values(os.getenv("TENANT_MAX_NODES", ""))
+TENANT_MAX_MEMORY = parse_tenant_values(os.getenv("TENANT_MAX_MEMORY", ""))
+CORE_GFLOPS = float(os.getenv("CORE_GFLOPS", "10"))
+ACCELERATOR_SPEEDUP = float(os.getenv("ACCELERATOR_SPEEDUP", "10"))
 PIPELINE_FILENAME = "pipeline.py"
 KFP_PREFIX = "kfp_"
+KFP_PACKAGE_FILENAME = "kfp_pipeline.yaml"
+KFP_SPECULATIVE_FILENAME = "kfp_speculative.yaml"
 METADATA_FILENAME = "metadata.json"
 DATASETS_PATH = os.getenv("DATASETS_PATH")
+DATASETS_SCAN_INTERVAL = int(os.getenv("DATASETS_SCAN_INTERVAL", "60"))
+FOOTPRINT_SAMPLE_ROWS = int(os.getenv("FOOTPRINT_SAMPLE_ROWS", "1000"))
 EPOCH_DATE = datetime.fromtimestamp(0, tz=tz.tzutc())
 PLACER = os.getenv("PLACER")
 SEED = int(os.getenv("SEED", "42"))
 N_PIPELINES_CSV = os.getenv("N_PIPELINES_CSV")
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "64"))
 
 pipelines_dir = Path(PIPELINES_DIR).resolve()
 pipelines_dir.mkdir(parents=True, exist_ok=True)
+templates_dir = pipelines_dir / ".templates"
+templates_dir.mkdir(parents=True, exist_ok=True)
+blobs_dir = pipelines_dir / ".blobs"
+blobs_dir.mkdir(parents=True, exist_ok=True)
+artifact_cache_file = pipelines_dir / ".artifact_cache.json"
 
 # Configure logger
 logger.remove()
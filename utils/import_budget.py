@@ -0,0 +1,63 @@
+"""
+Check that importing the pipeline definition library stays within a time budget.
+
+Usage: python utils/import_budget.py [budget_ms] [runs]
+
+The import is timed with `python -X importtime` in a fresh interpreter, counting only
+the top-level imports it adds over an empty interpreter. The best of several runs is
+compared to the budget, and the script exits with a non-zero status if it is exceeded.
+"""
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+
+STATEMENT = "from mlopx.pipelines import Pipeline, Component"
+DEFAULT_BUDGET_MS = 30.0
+DEFAULT_RUNS = 5
+CLIENT_SRC = Path(__file__).resolve().parent.parent / "client" / "src"
+
+
+def top_level_imports(statement: str) -> dict:
+    """
+    Run a statement with -X importtime and map its top-level imports to their cumulative time (in us).
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(CLIENT_SRC), os.getenv("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        sys.exit(f"Import failed:\n{result.stderr}")
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):    # nested imports are indented
+            imports[name.strip()] = int(cumulative)
+    return imports
+
+
+def measure(statement: str) -> float:
+    """
+    Get the time (in ms) of the top-level imports of a statement not done by an empty interpreter.
+    """
+    baseline = top_level_imports("pass")
+    imports = top_level_imports(statement)
+    return sum(t for name, t in imports.items() if name not in baseline) / 1000
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RUNS
+    best = min(measure(STATEMENT) for _ in range(runs))
+    print(f"'{STATEMENT}' took {best:.1f} ms (budget {budget:.1f} ms)")
+    if best > budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()